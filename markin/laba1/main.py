@@ -1,10 +1,16 @@
 import sys
 import random
 import json
+import queue
+import selectors
 import socket
+import struct
 import threading
 import time
+import zlib
 import argparse
+import csv
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 
 import pygame
@@ -16,6 +22,8 @@ import os
 WINDOW_WIDTH = 900
 WINDOW_HEIGHT = 600
 FPS = 60
+TICK_RATE = FPS  # fixed simulation ticks per second; all *_FRAMES timers count ticks
+MAX_TICKS_PER_FRAME = 5
 
 # Colors
 COLOR_BG = (20, 20, 24)
@@ -32,6 +40,7 @@ COLOR_MINIMAP_BORDER = (60, 60, 70)
 
 # Gameplay
 TANK_SIZE = (38, 38)
+SPAWN_POSITIONS = ((60, WINDOW_HEIGHT // 2 - TANK_SIZE[1] // 2), (WINDOW_WIDTH - 60 - TANK_SIZE[0], WINDOW_HEIGHT // 2 - TANK_SIZE[1] // 2))
 TANK_SPEED = 3.0
 TANK_ROTATE_SPEED = 4.0  # degrees per frame, unused with 4-dir tank
 
@@ -39,23 +48,116 @@ BULLET_SPEED = 8.0
 BULLET_RADIUS = 4
 BULLET_COOLDOWN_FRAMES = 18
 BULLET_MAX_ALIVE_FRAMES = FPS * 3
+BULLET_TRAIL_LENGTH = 8
+
+TANK_EXPLOSION_RADIUS = 90
+TANK_EXPLOSION_LIFE = int(FPS * 0.6)
+
+PARTICLE_CAPACITY = 4096
+PARTICLE_RADIUS = 3
 
 WALL_MIN_COUNT = 6
 WALL_MAX_COUNT = 10
+WALL_HP = 3
 WALL_SPACING = 10  # минимальный зазор между блоками стен
+WALL_GRID_CELL = 64  # размер ячейки пространственной сетки стен
 
 WIN_SCORE = 5
 
+POWERUP_DURATION_MS = {"shield": 5000, "rapid": 5000, "speed": 5000}
+
 
 def clamp(value: float, min_value: float, max_value: float) -> float:
     return max(min_value, min(max_value, value))
 
 
-def make_vignette(surface_size: tuple[int, int]) -> pygame.Surface:
+def swept_aabb_time(px: float, py: float, mx: float, my: float, half: float, rect: pygame.Rect) -> float | None:
+    # Fraction of the move (px, py) -> (px + mx, py + my) at which a box of the given
+    # half-size first overlaps rect (slab test against rect grown by half), or None
+    t_enter = 0.0
+    t_exit = 1.0
+    for p, m, lo, hi in ((px, mx, rect.left - half, rect.right + half), (py, my, rect.top - half, rect.bottom + half)):
+        if m == 0:
+            if not (lo < p < hi):
+                return None
+            continue
+        t1 = (lo - p) / m
+        t2 = (hi - p) / m
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_enter = max(t_enter, t1)
+        t_exit = min(t_exit, t2)
+        if t_enter >= t_exit:
+            return None
+    return t_enter
+
+
+# Static backdrop surfaces are memoized per resolution in-process and on disk
+BACKDROP_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+BACKDROP_CACHE_VERSION = 1
+_BACKDROP_CACHE: dict[tuple[str, int, int], pygame.Surface] = {}
+
+BG_GRADIENT_TOP = (18, 22, 28)
+BG_GRADIENT_BOTTOM = (14, 16, 20)
+BG_GRID_COLOR = (26, 26, 30)
+BG_GRID_SPACING = 40
+
+
+def _backdrop_cache_tag() -> str:
+    # Files on disk are keyed by the look constants too, so editing a color never serves a stale image
+    look = (BACKDROP_CACHE_VERSION, BG_GRADIENT_TOP, BG_GRADIENT_BOTTOM, BG_GRID_COLOR, BG_GRID_SPACING)
+    return f"{zlib.crc32(repr(look).encode('utf-8')):08x}"
+
+
+def _cached_backdrop(name: str, size: tuple[int, int], alpha: bool, build) -> pygame.Surface:
+    w, h = size
+    key = (name, w, h)
+    surf = _BACKDROP_CACHE.get(key)
+    if surf is not None:
+        return surf
+    path = os.path.join(BACKDROP_CACHE_DIR, f"{name}_{_backdrop_cache_tag()}_{w}x{h}.png")
+    try:
+        surf = pygame.image.load(path)
+        if surf.get_size() != (w, h):
+            surf = None
+    except Exception:
+        surf = None
+    if surf is None:
+        surf = build(size)
+        try:
+            os.makedirs(BACKDROP_CACHE_DIR, exist_ok=True)
+            pygame.image.save(surf, path)
+        except Exception:
+            pass
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert_alpha() if alpha else surf.convert()
+    elif alpha and not surf.get_flags() & pygame.SRCALPHA:
+        surf = surf.convert_alpha()
+    _BACKDROP_CACHE[key] = surf
+    return surf
+
+
+def _build_vignette(surface_size: tuple[int, int]) -> pygame.Surface:
     w, h = surface_size
     surf = pygame.Surface((w, h), pygame.SRCALPHA)
     cx, cy = w / 2, h / 2
     max_d = (cx ** 2 + cy ** 2) ** 0.5
+    try:
+        import numpy as np
+    except Exception:
+        np = None
+    if np is not None:
+        # Same 2x2 block sampling as the loop below, evaluated as one array expression
+        xs = np.arange(0, w, 2, dtype=np.float64) - cx
+        ys = np.arange(0, h, 2, dtype=np.float64) - cy
+        d = np.sqrt(xs[:, None] ** 2 + ys[None, :] ** 2)
+        a = (140 * (d / max_d) ** 1.6).astype(np.uint8)
+        a = np.repeat(np.repeat(a, 2, axis=0), 2, axis=1)[:w, :h]
+        surf.fill((0, 0, 0, 0))
+        alpha = pygame.surfarray.pixels_alpha(surf)
+        alpha[:, :] = a
+        del alpha
+        return surf
     for y in range(0, h, 2):
         for x in range(0, w, 2):
             dx = x - cx
@@ -67,6 +169,90 @@ def make_vignette(surface_size: tuple[int, int]) -> pygame.Surface:
     return surf
 
 
+def _build_bg_gradient(surface_size: tuple[int, int]) -> pygame.Surface:
+    w, h = surface_size
+    grad = pygame.Surface((w, h))
+    top = pygame.Color(*BG_GRADIENT_TOP)
+    bottom = pygame.Color(*BG_GRADIENT_BOTTOM)
+    try:
+        import numpy as np
+    except Exception:
+        np = None
+    if np is not None:
+        t = np.arange(h, dtype=np.float64) / max(1, h - 1)
+        rows = (np.array(top[:3], dtype=np.float64)[None, :] * (1 - t)[:, None]
+                + np.array(bottom[:3], dtype=np.float64)[None, :] * t[:, None]).astype(np.uint8)
+        pygame.surfarray.blit_array(grad, np.broadcast_to(rows[None, :, :], (w, h, 3)).copy())
+        return grad
+    for y in range(h):
+        t = y / max(1, h - 1)
+        c = (
+            int(top.r * (1 - t) + bottom.r * t),
+            int(top.g * (1 - t) + bottom.g * t),
+            int(top.b * (1 - t) + bottom.b * t),
+        )
+        pygame.draw.line(grad, c, (0, y), (w, y))
+    return grad
+
+
+def make_vignette(surface_size: tuple[int, int]) -> pygame.Surface:
+    return _cached_backdrop("vignette", surface_size, True, _build_vignette)
+
+
+def make_bg_gradient(surface_size: tuple[int, int]) -> pygame.Surface:
+    return _cached_backdrop("bg_gradient", surface_size, False, _build_bg_gradient)
+
+
+def _build_background_layer(surface_size: tuple[int, int]) -> pygame.Surface:
+    w, h = surface_size
+    layer = pygame.Surface((w, h))
+    # Gradient
+    layer.blit(make_bg_gradient(surface_size), (0, 0))
+    # Subtle grid
+    for x in range(0, w, BG_GRID_SPACING):
+        pygame.draw.line(layer, BG_GRID_COLOR, (x, 0), (x, h))
+    for y in range(0, h, BG_GRID_SPACING):
+        pygame.draw.line(layer, BG_GRID_COLOR, (0, y), (w, y))
+    # Vignette
+    layer.blit(make_vignette(surface_size), (0, 0))
+    return layer
+
+
+def make_background_layer(surface_size: tuple[int, int]) -> pygame.Surface:
+    # Gradient, grid and vignette flattened into one opaque surface
+    return _cached_backdrop("background", surface_size, False, _build_background_layer)
+
+
+# Fonts are loaded once per (name, size, bold); SysFont scans system fonts and is slow
+UI_FONT_NAME = "consolas"
+_FONT_REGISTRY: dict[tuple[str, int, bool], pygame.font.Font] = {}
+TEXT_CACHE_LIMIT = 256
+_TEXT_CACHE: "OrderedDict[tuple[pygame.font.Font, str, tuple[int, int, int]], pygame.Surface]" = OrderedDict()
+
+
+def get_font(size: int, bold: bool = False, name: str = UI_FONT_NAME) -> pygame.font.Font:
+    key = (name, size, bold)
+    font = _FONT_REGISTRY.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, size, bold=bold)
+        _FONT_REGISTRY[key] = font
+    return font
+
+
+def render_text(font: pygame.font.Font, text: str, color: tuple[int, int, int]) -> pygame.Surface:
+    # LRU cache of antialiased text surfaces, so unchanged strings are not re-rendered every frame
+    key = (font, text, tuple(color))
+    surf = _TEXT_CACHE.get(key)
+    if surf is not None:
+        _TEXT_CACHE.move_to_end(key)
+        return surf
+    surf = font.render(text, True, color)
+    _TEXT_CACHE[key] = surf
+    if len(_TEXT_CACHE) > TEXT_CACHE_LIMIT:
+        _TEXT_CACHE.popitem(last=False)
+    return surf
+
+
 @dataclass
 class Controls:
     up: int
@@ -76,73 +262,377 @@ class Controls:
     fire: int
 
 
+@dataclass
+class TankInput:
+    # One tick of input for a tank; fire is a trigger pull (edge), not a held key
+    up: bool = False
+    down: bool = False
+    left: bool = False
+    right: bool = False
+    fire: bool = False
+    # Client input sequence number this came from (0 for local input)
+    seq: int = 0
+
+    @classmethod
+    def from_pressed(cls, pressed, controls: Controls, fire: bool = False) -> "TankInput":
+        return cls(
+            up=bool(pressed[controls.up]),
+            down=bool(pressed[controls.down]),
+            left=bool(pressed[controls.left]),
+            right=bool(pressed[controls.right]),
+            fire=fire,
+        )
+
+
+REMOTE_INPUT_STALE_MS = 500
+INPUT_REDUNDANCY = 4  # input frames per packet: the current one plus this many - 1 before it
+INPUT_MAX_BACKLOG = 1  # queued remote input frames (ticks of delay) kept to absorb jitter
+INPUT_RESTART_GAP = TICK_RATE * 10
+INPUT_HISTORY_TICKS = TICK_RATE * 2  # unacknowledged inputs a predicting client keeps for replay
+INTERP_DELAY_MS = 100  # remote entities are drawn this far behind the newest host snapshot
+SNAPSHOT_BUFFER_SIZE = 32
+MAX_EXTRAPOLATION_MS = 150  # how far past the newest snapshot we keep moving things when packets are late
+
+
+class RemoteInput:
+    # Held keys received from a network player, turned into one TankInput per tick.
+    # Sequenced input frames (client tick 'n') are deduplicated and applied one per
+    # tick in order; unsequenced messages (n = 0) just replace the held keys
+    def __init__(self) -> None:
+        self.keys = {'up': False, 'down': False, 'left': False, 'right': False, 'fire': False}
+        self.last_ms = 0
+        # Fire pressed in some frame since the last tick (a trigger pull, not the held key)
+        self.fire_pending = False
+        # Last input frame applied to the simulation, and received frames not applied yet
+        self.seq = 0
+        self.pending: dict[int, dict] = {}
+        # Address the host received the last input from
+        self.source: tuple[str, int] | None = None
+
+    def poll(self, msgs: list[dict], now: int) -> None:
+        # msgs: every input received since the last poll, oldest first
+        if msgs and now - self.last_ms > REMOTE_INPUT_STALE_MS:
+            # Input resumes after a silence: possibly a restarted client, which counts from 1 again
+            self.seq = 0
+            self.pending.clear()
+        for msg in msgs:
+            self.last_ms = now
+            if msg.get('src') != self.source:
+                # Another client took over this slot: its frame numbering is its own
+                self.source = msg.get('src')
+                self.seq = 0
+                self.pending.clear()
+            for frame in input_frames(msg):
+                n = frame['n']
+                if not n:
+                    self._apply(frame)
+                    continue
+                if n + INPUT_RESTART_GAP < self.seq:
+                    # Numbering started over: the client restarted on the same address
+                    self.seq = 0
+                    self.pending.clear()
+                if n > self.seq:
+                    self.pending.setdefault(n, frame)
+        # If stale, treat as no input
+        if now - self.last_ms > REMOTE_INPUT_STALE_MS:
+            self.keys = {'up': False, 'down': False, 'left': False, 'right': False, 'fire': False}
+            self.pending.clear()
+
+    def _apply(self, frame: dict) -> None:
+        # A press seen in any frame counts, even if released again before this tick
+        if frame['fire'] and not self.keys['fire']:
+            self.fire_pending = True
+        self.keys = {key: frame[key] for key in self.keys}
+        self.seq = frame['n'] or self.seq
+
+    def to_tank_input(self) -> TankInput:
+        pending = self.pending
+        if pending:
+            order = sorted(pending)
+            # Too far behind (burst after a stall): fold the oldest frames in at once
+            for n in order[:max(1, len(order) - INPUT_MAX_BACKLOG)]:
+                self._apply(pending.pop(n))
+        fire = self.fire_pending
+        self.fire_pending = False
+        return TankInput(up=self.keys['up'], down=self.keys['down'], left=self.keys['left'], right=self.keys['right'], fire=fire, seq=self.seq)
+
+
+class SnapshotBuffer:
+    # Client-side jitter buffer of recent host snapshots, ordered by host time 't'.
+    # Remote entities are sampled delay_ms in the past, between the two snapshots around
+    # that moment, so they move smoothly at any frame rate and survive jittery arrival
+    def __init__(self, delay_ms: int = INTERP_DELAY_MS, size: int = SNAPSHOT_BUFFER_SIZE) -> None:
+        self.delay_ms = delay_ms
+        self.snapshots: deque[dict] = deque(maxlen=size)
+        # Host clock minus local clock, biased toward the least delayed arrival
+        self.offset: float | None = None
+
+    def push(self, state: dict, now: int) -> None:
+        t = state.get('t', 0)
+        if self.snapshots and t <= self.snapshots[-1]['t']:
+            if t + 5000 > self.snapshots[-1]['t']:
+                return
+            # Host clock jumped back (host restarted): start over
+            self.snapshots.clear()
+            self.offset = None
+        self.snapshots.append(state)
+        sample = t - now
+        if self.offset is None or sample > self.offset:
+            self.offset = sample
+        else:
+            self.offset += (sample - self.offset) * 0.05
+
+    def render_time(self, now: int) -> float:
+        return now + (self.offset or 0.0) - self.delay_ms
+
+    def _bracket(self, t: float) -> tuple[dict, dict, float] | None:
+        # Two snapshots to blend and the blend factor; past 1.0 means extrapolating
+        snaps = self.snapshots
+        if not snaps:
+            return None
+        if len(snaps) == 1 or t <= snaps[0]['t']:
+            return snaps[0], snaps[0], 0.0
+        for i in range(len(snaps) - 1, 0, -1):
+            a, b = snaps[i - 1], snaps[i]
+            if a['t'] <= t:
+                span = max(1, b['t'] - a['t'])
+                limit = 1.0 + MAX_EXTRAPOLATION_MS / span
+                return a, b, min((t - a['t']) / span, limit)
+        return snaps[0], snaps[0], 0.0
+
+    def tank_position(self, idx: int, now: int) -> tuple[float, float] | None:
+        bracket = self._bracket(self.render_time(now))
+        if bracket is None:
+            return None
+        a, b, f = bracket
+        ta, tb = a['tanks'][idx], b['tanks'][idx]
+        # Respawns and deaths teleport; don't slide across the map
+        reach = 2 * TANK_SPEED * max(1.0, (b['t'] - a['t']) * TICK_RATE / 1000.0)
+        if not (tb.get('alive', True) and ta.get('alive', True)) or abs(tb['x'] - ta['x']) + abs(tb['y'] - ta['y']) > reach:
+            return tb['x'], tb['y']
+        return ta['x'] + (tb['x'] - ta['x']) * f, ta['y'] + (tb['y'] - ta['y']) * f
+
+    def bullet_positions(self, now: int) -> dict[int, tuple[float, float, dict]]:
+        # Bullets alive at render time: id -> (x, y, bullet record). A bullet first seen
+        # in a snapshot newer than render time isn't drawn yet, and one the later snapshot
+        # dropped stays at its last position until render time reaches that snapshot
+        t = self.render_time(now)
+        bracket = self._bracket(t)
+        if bracket is None:
+            return {}
+        a, b, f = bracket
+        if t < a['t']:
+            return {}
+        if t >= b['t']:
+            # Past the newest snapshot: bullets fly straight at a fixed speed
+            step = (min(t, b['t'] + MAX_EXTRAPOLATION_MS) - b['t']) * TICK_RATE / 1000.0 * BULLET_SPEED
+            return {blt['id']: (blt['x'] + blt['dx'] * step, blt['y'] + blt['dy'] * step, blt) for blt in b['bullets']}
+        later = {blt['id']: blt for blt in b['bullets']}
+        positions = {}
+        for blt in a['bullets']:
+            nb = later.get(blt['id'])
+            if nb is None:
+                positions[blt['id']] = (blt['x'], blt['y'], blt)
+            else:
+                positions[blt['id']] = (blt['x'] + (nb['x'] - blt['x']) * f, blt['y'] + (nb['y'] - blt['y']) * f, nb)
+        return positions
+
+
+# Baked wall sprites: (w, h, position hash, hp, max_hp) -> (dark sprite, lit sprite, window rects)
+_WALL_SPRITE_CACHE: dict[tuple[int, int, int, int, int], tuple[pygame.Surface, pygame.Surface, list[pygame.Rect]]] = {}
+WALL_SPRITE_CACHE_LIMIT = 256
+
+
+def _bake_wall_sprites(w: int, h: int, rng: int, hp: int, max_hp: int) -> tuple[pygame.Surface, pygame.Surface, list[pygame.Rect]]:
+    # Building base color with subtle variation by position
+    base = (80 + rng % 30, 80 + (rng // 2) % 25, 95 + (rng // 3) % 30)
+    outline = (40, 40, 58)
+    roof_dark = (base[0] - 20 if base[0] > 20 else 0, base[1] - 20 if base[1] > 20 else 0, base[2] - 25 if base[2] > 25 else 0)
+    roof_light = (min(base[0] + 20, 255), min(base[1] + 20, 255), min(base[2] + 30, 255))
+
+    # Damage tint: the lower the hp, the darker
+    if hp < max_hp:
+        factor = 0.7 + 0.3 * (hp / max(1, max_hp))
+        base = (int(base[0] * factor), int(base[1] * factor), int(base[2] * factor))
+
+    r = pygame.Rect(0, 0, w, h)
+    sprite = pygame.Surface((w, h), pygame.SRCALPHA)
+
+    # Body with subtle pattern
+    body = pygame.Surface((w, h), pygame.SRCALPHA)
+    body.fill((*base, 255))
+    for i in range(0, h, 6):
+        pygame.draw.line(body, (base[0]-8 if base[0]>8 else 0, base[1]-8 if base[1]>8 else 0, base[2]-10 if base[2]>10 else 0), (6, i), (w-6, i))
+    pygame.draw.rect(body, (0,0,0,0), body.get_rect(), width=0, border_radius=6)
+    sprite.blit(body, (0, 0))
+    pygame.draw.rect(sprite, outline, r, width=2, border_radius=6)
+
+    # Roof strip and subtle gradient
+    roof_h = max(10, h // 8)
+    roof_rect = pygame.Rect(0, 0, w, roof_h)
+    pygame.draw.rect(sprite, roof_dark, roof_rect, border_top_left_radius=6, border_top_right_radius=6)
+    grad = pygame.Surface((w, roof_h), pygame.SRCALPHA)
+    for i in range(roof_h):
+        a = int(90 * (1 - i / roof_h))
+        pygame.draw.line(grad, (*roof_light, a), (0, i), (w, i))
+    sprite.blit(grad, roof_rect.topleft)
+
+    # Windows grid (all dark here, the lit copy below is used for twinkle)
+    margin_x = 8
+    margin_y = roof_h + 8
+    win_w, win_h = 12, 16
+    gap_x, gap_y = 8, 8
+    cols = max(1, (w - margin_x * 2 + gap_x) // (win_w + gap_x))
+    rows = max(1, (h - margin_y - 8 + gap_y) // (win_h + gap_y))
+    start_x = (w - (cols * win_w + (cols - 1) * gap_x)) // 2
+    start_y = margin_y
+    window_on = (230, 225, 160)
+    window_off = (105, 110, 120)
+    windows = []
+    for cy in range(rows):
+        for cx in range(cols):
+            windows.append(pygame.Rect(start_x + cx * (win_w + gap_x), start_y + cy * (win_h + gap_y), win_w, win_h))
+    lit = sprite.copy()
+    for target, color in ((sprite, window_off), (lit, window_on)):
+        for rect in windows:
+            pygame.draw.rect(target, color, rect, border_radius=3)
+            pygame.draw.rect(target, (70, 70, 82), rect, width=1, border_radius=3)
+
+        # Vertical accents (pilasters)
+        pilasters = max(2, cols - 1)
+        for i in range(1, pilasters + 1):
+            px = i * w // (pilasters + 1)
+            pygame.draw.line(target, (base[0] - 10 if base[0] > 10 else 0, base[1] - 10 if base[1] > 10 else 0, base[2] - 15 if base[2] > 15 else 0), (px, roof_h), (px, h - 6), width=2)
+
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert_alpha()
+        lit = lit.convert_alpha()
+    return sprite, lit, windows
+
+
+def get_wall_sprites(w: int, h: int, rng: int, hp: int, max_hp: int) -> tuple[pygame.Surface, pygame.Surface, list[pygame.Rect]]:
+    key = (w, h, rng, max(0, min(hp, max_hp)), max_hp)
+    cached = _WALL_SPRITE_CACHE.get(key)
+    if cached is None:
+        if len(_WALL_SPRITE_CACHE) >= WALL_SPRITE_CACHE_LIMIT:
+            _WALL_SPRITE_CACHE.clear()
+        cached = _bake_wall_sprites(*key)
+        _WALL_SPRITE_CACHE[key] = cached
+    return cached
+
+
 class Wall:
-    def __init__(self, rect: pygame.Rect, hp: int = 3):
+    def __init__(self, rect: pygame.Rect, hp: int | None = None):
+        # Read at construction, so an overridden WALL_HP applies to every new wall
+        hp = WALL_HP if hp is None else hp
         self.rect = rect
         self.max_hp = hp
         self.hp = hp
+        # Stable network ID, assigned by the simulation that owns the wall
+        self.id = 0
 
     def draw(self, surface: pygame.Surface, ox: int = 0, oy: int = 0) -> None:
         r = self.rect.move(ox, oy)
-
-        # Building base color with subtle variation by position
-        rng = (r.x * 73856093 ^ r.y * 19349663) & 0xFF
-        base = (80 + rng % 30, 80 + (rng // 2) % 25, 95 + (rng // 3) % 30)
-        outline = (40, 40, 58)
-        roof_dark = (base[0] - 20 if base[0] > 20 else 0, base[1] - 20 if base[1] > 20 else 0, base[2] - 25 if base[2] > 25 else 0)
-        roof_light = (min(base[0] + 20, 255), min(base[1] + 20, 255), min(base[2] + 30, 255))
-
-        # Damage tint: the lower the hp, the darker
-        if self.hp < self.max_hp:
-            factor = 0.7 + 0.3 * (self.hp / max(1, self.max_hp))
-            base = (int(base[0] * factor), int(base[1] * factor), int(base[2] * factor))
-
-        # Body with subtle pattern
-        body = pygame.Surface((r.width, r.height), pygame.SRCALPHA)
-        body.fill((*base, 255))
-        for i in range(0, r.height, 6):
-            pygame.draw.line(body, (base[0]-8 if base[0]>8 else 0, base[1]-8 if base[1]>8 else 0, base[2]-10 if base[2]>10 else 0), (6, i), (r.width-6, i))
-        pygame.draw.rect(body, (0,0,0,0), body.get_rect(), width=0, border_radius=6)
-        surface.blit(body, r.topleft)
-        pygame.draw.rect(surface, outline, r, width=2, border_radius=6)
-
-        # Roof strip and subtle gradient
-        roof_h = max(10, r.height // 8)
-        roof_rect = pygame.Rect(r.x, r.y, r.width, roof_h)
-        pygame.draw.rect(surface, roof_dark, roof_rect, border_top_left_radius=6, border_top_right_radius=6)
-        grad = pygame.Surface((r.width, roof_h), pygame.SRCALPHA)
-        for i in range(roof_h):
-            a = int(90 * (1 - i / roof_h))
-            pygame.draw.line(grad, (*roof_light, a), (0, i), (r.width, i))
-        surface.blit(grad, roof_rect.topleft)
-
-        # Windows grid
-        margin_x = 8
-        margin_y = roof_h + 8
-        win_w, win_h = 12, 16
-        gap_x, gap_y = 8, 8
-        cols = max(1, (r.width - margin_x * 2 + gap_x) // (win_w + gap_x))
-        rows = max(1, (r.height - margin_y - 8 + gap_y) // (win_h + gap_y))
-        start_x = r.x + (r.width - (cols * win_w + (cols - 1) * gap_x)) // 2
-        start_y = r.y + margin_y
-        window_on = (230, 225, 160)
-        window_off = (105, 110, 120)
-        for cy in range(rows):
-            for cx in range(cols):
-                wx = start_x + cx * (win_w + gap_x)
-                wy = start_y + cy * (win_h + gap_y)
-                # Twinkle pattern (deterministic subtlety)
-                tw = ((wx + wy + (pygame.time.get_ticks() // 700)) // 13) % 7
-                color = window_on if tw in (0, 1) else window_off
-                rect = pygame.Rect(wx, wy, win_w, win_h)
-                pygame.draw.rect(surface, color, rect, border_radius=3)
-                pygame.draw.rect(surface, (70, 70, 82), rect, width=1, border_radius=3)
-        
-        # Vertical accents (pilasters)
-        pilasters = max(2, cols - 1)
-        for i in range(1, pilasters + 1):
-            px = r.x + i * r.width // (pilasters + 1)
-            pygame.draw.line(surface, (base[0] - 10 if base[0] > 10 else 0, base[1] - 10 if base[1] > 10 else 0, base[2] - 15 if base[2] > 15 else 0), (px, r.y + roof_h), (px, r.bottom - 6), width=2)
+        # Color variation is keyed by the resting position so shake doesn't rebake sprites
+        rng = (self.rect.x * 73856093 ^ self.rect.y * 19349663) & 0xFF
+        sprite, lit, windows = get_wall_sprites(r.width, r.height, rng, self.hp, self.max_hp)
+        surface.blit(sprite, r.topleft)
+
+        # Twinkle overlay: copy lit windows over the dark ones (deterministic subtlety)
+        phase = pygame.time.get_ticks() // 700
+        for rect in windows:
+            wx = r.x + rect.x
+            wy = r.y + rect.y
+            if ((wx + wy + phase) // 13) % 7 in (0, 1):
+                surface.blit(lit, (wx, wy), rect)
+
+
+class WallGrid:
+    # Uniform grid over wall rects; queries return walls in list order so collision
+    # resolution matches a linear scan
+    def __init__(self, cell: int = WALL_GRID_CELL) -> None:
+        self.cell = cell
+        self._cells: dict[tuple[int, int], list[Wall]] = {}
+        self._order: dict[int, int] = {}
+        self._next_order = 0
+
+    def _cell_range(self, rect: pygame.Rect) -> tuple[range, range]:
+        c = self.cell
+        return range(rect.left // c, (rect.right - 1) // c + 1), range(rect.top // c, (rect.bottom - 1) // c + 1)
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._order.clear()
+        self._next_order = 0
+
+    def rebuild(self, walls: list[Wall]) -> None:
+        self.clear()
+        for wall in walls:
+            self.insert(wall)
+
+    def insert(self, wall: Wall) -> None:
+        self._order[id(wall)] = self._next_order
+        self._next_order += 1
+        xs, ys = self._cell_range(wall.rect)
+        for cx in xs:
+            for cy in ys:
+                self._cells.setdefault((cx, cy), []).append(wall)
+
+    def remove(self, wall: Wall) -> None:
+        if self._order.pop(id(wall), None) is None:
+            return
+        xs, ys = self._cell_range(wall.rect)
+        for cx in xs:
+            for cy in ys:
+                bucket = self._cells.get((cx, cy))
+                if bucket and wall in bucket:
+                    bucket.remove(wall)
+
+    def query(self, rect: pygame.Rect) -> list[Wall]:
+        xs, ys = self._cell_range(rect)
+        cells = self._cells
+        if len(xs) == 1 and len(ys) == 1:
+            return list(cells.get((xs[0], ys[0]), ()))
+        found: dict[int, Wall] = {}
+        for cx in xs:
+            for cy in ys:
+                for wall in cells.get((cx, cy), ()):
+                    found[id(wall)] = wall
+        if len(found) < 2:
+            return list(found.values())
+        order = self._order
+        return sorted(found.values(), key=lambda w: order[id(w)])
+
+
+# Per-color bullet atlas: color -> (glow + core sprite, trail dot sprites from newest to oldest)
+_BULLET_SPRITE_CACHE: dict[tuple[int, int, int], tuple[pygame.Surface, list[pygame.Surface]]] = {}
+
+
+def get_bullet_sprites(color: tuple[int, int, int]) -> tuple[pygame.Surface, list[pygame.Surface]]:
+    cached = _BULLET_SPRITE_CACHE.get(color)
+    if cached is not None:
+        return cached
+    # Glow rings with the core on top
+    size = BULLET_RADIUS * 8
+    c = BULLET_RADIUS * 4
+    head = pygame.Surface((size, size), pygame.SRCALPHA)
+    for i, alpha in enumerate([40, 30, 18]):
+        pygame.draw.circle(head, (*color, alpha), (c, c), BULLET_RADIUS + 6 - i * 2)
+    pygame.draw.circle(head, color, (c, c), BULLET_RADIUS)
+    # Trail dots fading out with age
+    dot_r = max(BULLET_RADIUS - 1, 2)
+    trail = []
+    for age in range(BULLET_TRAIL_LENGTH):
+        alpha = int(200 * (BULLET_TRAIL_LENGTH - age) / BULLET_TRAIL_LENGTH)
+        dot = pygame.Surface((dot_r * 2 + 1, dot_r * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(dot, (*color, alpha), (dot_r, dot_r), dot_r)
+        trail.append(dot)
+    if pygame.display.get_surface() is not None:
+        head = head.convert_alpha()
+        trail = [dot.convert_alpha() for dot in trail]
+    cached = (head, trail)
+    _BULLET_SPRITE_CACHE[color] = cached
+    return cached
 
 
 class Bullet:
@@ -156,62 +646,77 @@ class Bullet:
         self.is_active = True
         self.trail: list[tuple[float, float]] = []
         self.bounces_left = 0  # disable ricochets by default
+        # Position before the last update, for render interpolation
+        self.prev_x = x
+        self.prev_y = y
+        self.id = 0
 
-    def update(self, walls: list[Wall]) -> None:
+    def update(self, walls: list[Wall], grid: WallGrid | None = None) -> None:
         if not self.is_active:
             return
         # Add to trail
         self.trail.append((self.x, self.y))
-        if len(self.trail) > 8:
+        if len(self.trail) > BULLET_TRAIL_LENGTH:
             self.trail.pop(0)
 
         prev_x, prev_y = self.x, self.y
-        self.x += self.dx * BULLET_SPEED
-        self.y += self.dy * BULLET_SPEED
+        self.prev_x, self.prev_y = prev_x, prev_y
+        mx = self.dx * BULLET_SPEED
+        my = self.dy * BULLET_SPEED
+        self.x += mx
+        self.y += my
         self.frames_alive += 1
 
-        # Deactivate on lifetime end or out of bounds
-        if (
-            self.frames_alive > BULLET_MAX_ALIVE_FRAMES
-            or self.x < 0
-            or self.x > WINDOW_WIDTH
-            or self.y < 0
-            or self.y > WINDOW_HEIGHT
-        ):
+        if self.frames_alive > BULLET_MAX_ALIVE_FRAMES:
             self.is_active = False
             return
 
-        # Collide with walls (no ricochet: destroy on hit) and damage
-        bullet_rect = pygame.Rect(int(self.x - BULLET_RADIUS), int(self.y - BULLET_RADIUS), BULLET_RADIUS * 2, BULLET_RADIUS * 2)
-        for wall in list(walls):
-            if bullet_rect.colliderect(wall.rect):
-                # Damage the wall
-                wall.hp -= 1
-                # Remove wall if destroyed
-                if wall.hp <= 0:
-                    try:
-                        walls.remove(wall)
-                    except ValueError:
-                        pass
-                self.is_active = False
-                break
+        # Swept collision with walls (no ricochet: destroy on the first wall along the move)
+        sweep = pygame.Rect(
+            int(min(prev_x, self.x) - BULLET_RADIUS) - 1,
+            int(min(prev_y, self.y) - BULLET_RADIUS) - 1,
+            int(abs(mx)) + BULLET_RADIUS * 2 + 3,
+            int(abs(my)) + BULLET_RADIUS * 2 + 3,
+        )
+        hit_wall = None
+        hit_t = 1.0
+        for wall in (grid.query(sweep) if grid is not None else walls):
+            t = swept_aabb_time(prev_x, prev_y, mx, my, BULLET_RADIUS, wall.rect)
+            if t is not None and (hit_wall is None or t < hit_t):
+                hit_wall = wall
+                hit_t = t
+        if hit_wall is not None:
+            # Stop at the contact point so impact effects spawn on the wall face
+            self.x = prev_x + mx * hit_t
+            self.y = prev_y + my * hit_t
+            # Damage the wall
+            hit_wall.hp -= 1
+            # Remove wall if destroyed
+            if hit_wall.hp <= 0:
+                try:
+                    walls.remove(hit_wall)
+                except ValueError:
+                    pass
+                if grid is not None:
+                    grid.remove(hit_wall)
+            self.is_active = False
+            return
+
+        # Deactivate out of bounds
+        if self.x < 0 or self.x > WINDOW_WIDTH or self.y < 0 or self.y > WINDOW_HEIGHT:
+            self.is_active = False
 
     def draw(self, surface: pygame.Surface, ox: int = 0, oy: int = 0) -> None:
         if not self.is_active:
             return
-        # Glow
-        glow_surface = pygame.Surface((BULLET_RADIUS * 8, BULLET_RADIUS * 8), pygame.SRCALPHA)
-        gx = BULLET_RADIUS * 4
-        gy = BULLET_RADIUS * 4
-        for i, alpha in enumerate([40, 30, 18]):
-            pygame.draw.circle(glow_surface, (*self.color, alpha), (gx, gy), BULLET_RADIUS + 6 - i * 2)
-        surface.blit(glow_surface, (int(self.x - gx + ox), int(self.y - gy + oy)))
-        # Trail
-        for i, (tx, ty) in enumerate(self.trail[:-1]):
-            a = max(30 - i * 4, 0)
-            pygame.draw.circle(surface, (*self.color, a), (int(tx + ox), int(ty + oy)), max(BULLET_RADIUS - 1, 2))
-        # Core
-        pygame.draw.circle(surface, self.color, (int(self.x + ox), int(self.y + oy)), BULLET_RADIUS)
+        head, trail = get_bullet_sprites(self.color)
+        # Trail (the newest point sits under the glow and is skipped), then glow + core
+        dot_r = trail[0].get_width() // 2
+        points = self.trail[:-1]
+        n = len(points)
+        batch = [(trail[n - 1 - i], (int(tx + ox) - dot_r, int(ty + oy) - dot_r)) for i, (tx, ty) in enumerate(points)]
+        batch.append((head, (int(self.x - BULLET_RADIUS * 4 + ox), int(self.y - BULLET_RADIUS * 4 + oy))))
+        surface.blits(batch, doreturn=False)
 
     def get_rect(self) -> pygame.Rect:
         return pygame.Rect(int(self.x - BULLET_RADIUS), int(self.y - BULLET_RADIUS), BULLET_RADIUS * 2, BULLET_RADIUS * 2)
@@ -233,13 +738,20 @@ class Tank:
         self.cooldown_frames_left = 0
         self.last_move_direction = pygame.Vector2(1, 0)
         self.score = 0
+        # Time source for buffs (ms); the simulation injects its own tick clock
+        self.clock = pygame.time.get_ticks
+        # Position before the last update, for render interpolation
+        self.prev_pos = self.rect.topleft
+        # Last client input sequence number the simulation consumed for this tank
+        self.input_seq = 0
 
     def reset_position(self, x: int, y: int) -> None:
         self.rect.topleft = (x, y)
+        self.prev_pos = self.rect.topleft
         self.last_move_direction.update(1, 0)
         self.cooldown_frames_left = 0
 
-    def update(self, pressed: pygame.key.ScancodeWrapper, walls: list[Wall]) -> None:
+    def update(self, pressed: pygame.key.ScancodeWrapper, walls: list[Wall], grid: WallGrid | None = None) -> None:
         dx = 0
         dy = 0
         if pressed[self.controls.up]:
@@ -250,7 +762,13 @@ class Tank:
             dx -= 1
         if pressed[self.controls.right]:
             dx += 1
+        self.drive(dx, dy, walls, grid)
+
+    def apply_input(self, inp: TankInput, walls: list[Wall], grid: WallGrid | None = None) -> None:
+        self.drive(int(inp.right) - int(inp.left), int(inp.down) - int(inp.up), walls, grid)
 
+    def drive(self, dx: int, dy: int, walls: list[Wall], grid: WallGrid | None = None) -> None:
+        self.prev_pos = self.rect.topleft
         # Speed buff
         speed = TANK_SPEED * (1.35 if tank_has_buff(self, "buff_speed_until") else 1.0)
 
@@ -260,15 +778,16 @@ class Tank:
             self.last_move_direction.update(0 if dx == 0 else (1 if dx > 0 else -1), 0 if dy == 0 else (1 if dy > 0 else -1))
 
         # Move with simple AABB collision resolution against walls
-        self._move_and_collide(movement, walls)
+        self._move_and_collide(movement, walls, grid)
 
         if self.cooldown_frames_left > 0:
             self.cooldown_frames_left -= 1
 
-    def _move_and_collide(self, movement: pygame.Vector2, walls: list[Wall]) -> None:
-        # Horizontal
+    def _move_and_collide(self, movement: pygame.Vector2, walls: list[Wall], grid: WallGrid | None = None) -> None:
+        # Horizontal (grid queries cover the swept span so pushback stays within queried cells)
+        before = self.rect.copy()
         self.rect.x += int(movement.x)
-        for wall in walls:
+        for wall in (grid.query(self.rect.union(before)) if grid is not None else walls):
             if self.rect.colliderect(wall.rect):
                 if movement.x > 0:
                     self.rect.right = wall.rect.left
@@ -276,8 +795,9 @@ class Tank:
                     self.rect.left = wall.rect.right
 
         # Vertical
+        before = self.rect.copy()
         self.rect.y += int(movement.y)
-        for wall in walls:
+        for wall in (grid.query(self.rect.union(before)) if grid is not None else walls):
             if self.rect.colliderect(wall.rect):
                 if movement.y > 0:
                     self.rect.bottom = wall.rect.top
@@ -374,61 +894,454 @@ class Particle:
         if self.life <= 0:
             return
         alpha = int(200 * (self.life / self.max_life))
-        pygame.draw.circle(surface, (*self.color, alpha), (int(self.x + ox), int(self.y + oy)), 3)
+        pygame.draw.circle(surface, (*self.color, alpha), (int(self.x + ox), int(self.y + oy)), PARTICLE_RADIUS)
 
 
-class Game:
-    _instance: "Game | None" = None
+# Structure-of-arrays particle pool with vectorized integration and batched blits.
+# Slots with life <= 0 are reused; when the pool is full the particles closest to
+# dying are overwritten. Falls back to a list of Particle objects without NumPy.
+class ParticleSystem:
+    ALPHA_STEPS = 8
 
-    def __init__(self, net_role: str | None = None, net: "NetManager | None" = None) -> None:
-        pygame.init()
-        pygame.display.set_caption("Tanki 2D")
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont("consolas", 22)
-        self.small_font = pygame.font.SysFont("consolas", 14)
+    def __init__(self, capacity: int = PARTICLE_CAPACITY) -> None:
+        self.capacity = capacity
+        self._palette: dict[tuple[int, int, int], int] = {}
+        self._colors: list[tuple[int, int, int]] = []
+        self._sprites: dict[tuple[int, int], pygame.Surface] = {}
+        try:
+            import numpy as np
+        except Exception:
+            np = None
+        self._np = np
+        self._items: list[Particle] = []
+        if np is not None:
+            self._rng = np.random.default_rng()
+            self.x = np.zeros(capacity, dtype=np.float32)
+            self.y = np.zeros(capacity, dtype=np.float32)
+            self.vx = np.zeros(capacity, dtype=np.float32)
+            self.vy = np.zeros(capacity, dtype=np.float32)
+            self.life = np.zeros(capacity, dtype=np.int32)
+            self.max_life = np.ones(capacity, dtype=np.int32)
+            self.color = np.zeros(capacity, dtype=np.int16)
+
+    def __len__(self) -> int:
+        if self._np is None:
+            return len(self._items)
+        return int((self.life > 0).sum())
+
+    def clear(self) -> None:
+        if self._np is None:
+            self._items.clear()
+        else:
+            self.life[:] = 0
+
+    def _color_id(self, color: tuple[int, int, int]) -> int:
+        cid = self._palette.get(color)
+        if cid is None:
+            cid = len(self._colors)
+            self._palette[color] = cid
+            self._colors.append(color)
+        return cid
+
+    def _sprite(self, cid: int, step: int) -> pygame.Surface:
+        sprite = self._sprites.get((cid, step))
+        if sprite is None:
+            alpha = int(200 * (step + 1) / self.ALPHA_STEPS)
+            sprite = pygame.Surface((PARTICLE_RADIUS * 2 + 1, PARTICLE_RADIUS * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (*self._colors[cid], alpha), (PARTICLE_RADIUS, PARTICLE_RADIUS), PARTICLE_RADIUS)
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert_alpha()
+            self._sprites[(cid, step)] = sprite
+        return sprite
+
+    def _alloc(self, n: int):
+        np = self._np
+        free = np.flatnonzero(self.life <= 0)
+        if len(free) >= n:
+            return free[:n]
+        n = min(n, self.capacity)
+        return np.argpartition(self.life, n - 1)[:n]
+
+    def emit(self, x: float, y: float, vx: float, vy: float, life: int, color: tuple[int, int, int]) -> None:
+        if self._np is None:
+            self._items.append(Particle(x, y, vx, vy, life=life, color=color))
+            if len(self._items) > self.capacity:
+                self._items.pop(0)
+            return
+        i = self._alloc(1)
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.max_life[i] = life
+        self.color[i] = self._color_id(color)
+
+    def burst(
+        self,
+        x: float,
+        y: float,
+        count: int,
+        speed: tuple[float, float],
+        life: tuple[int, int],
+        colors: list[tuple[int, int, int]],
+    ) -> None:
+        # Radial burst: random direction, speed and life ranges are inclusive, random color from colors
+        np = self._np
+        if np is None:
+            for _ in range(count):
+                v = pygame.math.Vector2(random.uniform(*speed), 0).rotate_rad(random.uniform(0, 3.14159 * 2))
+                self.emit(x, y, v.x, v.y, random.randint(*life), random.choice(colors))
+            return
+        idx = self._alloc(count)
+        n = len(idx)
+        ang = self._rng.uniform(0, 3.14159 * 2, n)
+        spd = self._rng.uniform(speed[0], speed[1], n)
+        lives = self._rng.integers(life[0], life[1] + 1, n)
+        cids = np.array([self._color_id(c) for c in colors], dtype=np.int16)
+        self.x[idx] = x
+        self.y[idx] = y
+        self.vx[idx] = spd * np.cos(ang)
+        self.vy[idx] = spd * np.sin(ang)
+        self.life[idx] = lives
+        self.max_life[idx] = lives
+        self.color[idx] = cids[self._rng.integers(0, len(cids), n)]
+
+    def update(self) -> None:
+        np = self._np
+        if np is None:
+            for p in self._items:
+                p.update()
+            self._items = [p for p in self._items if p.life > 0]
+            return
+        i = np.flatnonzero(self.life > 0)
+        if len(i) == 0:
+            return
+        self.x[i] += self.vx[i]
+        self.y[i] += self.vy[i]
+        self.vx[i] *= 0.96
+        self.vy[i] = self.vy[i] * 0.96 + 0.12  # slight gravity
+        self.life[i] -= 1
+
+    def draw(self, surface: pygame.Surface, ox: int = 0, oy: int = 0) -> None:
+        np = self._np
+        if np is None:
+            batch = [
+                (self._sprite(self._color_id(p.color), min(self.ALPHA_STEPS - 1, self.ALPHA_STEPS * p.life // max(1, p.max_life))),
+                 (int(p.x + ox) - PARTICLE_RADIUS, int(p.y + oy) - PARTICLE_RADIUS))
+                for p in self._items if p.life > 0
+            ]
+            surface.blits(batch, doreturn=False)
+            return
+        i = np.flatnonzero(self.life > 0)
+        if len(i) == 0:
+            return
+        steps = np.minimum(self.ALPHA_STEPS - 1, self.ALPHA_STEPS * self.life[i] // self.max_life[i])
+        px = ((self.x[i] + ox).astype(np.int32) - PARTICLE_RADIUS).tolist()
+        py = ((self.y[i] + oy).astype(np.int32) - PARTICLE_RADIUS).tolist()
+        sprite = self._sprite
+        batch = [(sprite(c, st), (x, y)) for c, st, x, y in zip(self.color[i].tolist(), steps.tolist(), px, py)]
+        surface.blits(batch, doreturn=False)
+
+
+class Minimap:
+    WIDTH = 200
+    HEIGHT = 130
+    PADDING = 10
+
+    def __init__(self, font: pygame.font.Font) -> None:
+        self.x0 = WINDOW_WIDTH - self.WIDTH - self.PADDING
+        self.y0 = WINDOW_HEIGHT - self.HEIGHT - self.PADDING - 28
+        self.sx = self.WIDTH / WINDOW_WIDTH
+        self.sy = self.HEIGHT / WINDOW_HEIGHT
+        self.label = render_text(font, "Minimap (M: music)", (180, 180, 190))
+        self._layer: pygame.Surface | None = None
+        self._baked_wall_count = -1
+        self._baked_map_version = -1
+
+    def _bake(self, walls: list[Wall]) -> None:
+        # Background, border and walls; only changes when a wall is destroyed or the map regenerates
+        layer = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
+        layer.fill((*COLOR_MINIMAP_BG, 200))
+        pygame.draw.rect(layer, COLOR_MINIMAP_BORDER, (0, 0, self.WIDTH, self.HEIGHT), width=2, border_radius=6)
+        for w in walls:
+            rx = int(self.x0 + w.rect.x * self.sx) - self.x0
+            ry = int(self.y0 + w.rect.y * self.sy) - self.y0
+            rw = max(1, int(w.rect.width * self.sx))
+            rh = max(1, int(w.rect.height * self.sy))
+            pygame.draw.rect(layer, (90, 100, 120), (rx, ry, rw, rh))
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert_alpha()
+        self._layer = layer
+        self._baked_wall_count = len(walls)
+
+    def draw(self, surface: pygame.Surface, game: "Game") -> None:
+        # Rebake when the map is regenerated, or when a wall goes down
+        # (destroyed walls are removed from the list, so the count changes)
+        if self._layer is None or self._baked_map_version != game.sim.map_version or self._baked_wall_count != len(game.walls):
+            self._bake(game.walls)
+            self._baked_map_version = game.sim.map_version
+        x0, y0, sx, sy = self.x0, self.y0, self.sx, self.sy
+        surface.blit(self._layer, (x0, y0))
+
+        # Draw powerups
+        for pu in game.powerups:
+            rx = int(x0 + pu.rect.centerx * sx)
+            ry = int(y0 + pu.rect.centery * sy)
+            pygame.draw.circle(surface, (180, 220, 120), (rx, ry), 3)
+
+        # Tanks
+        if not game.tank1_destroyed:
+            pygame.draw.circle(surface, COLOR_TANK_1, (int(x0 + game.tank1.rect.centerx * sx), int(y0 + game.tank1.rect.centery * sy)), 4)
+        if not game.tank2_destroyed:
+            pygame.draw.circle(surface, COLOR_TANK_2, (int(x0 + game.tank2.rect.centerx * sx), int(y0 + game.tank2.rect.centery * sy)), 4)
 
+        # Bullets
+        for b in game.bullets:
+            rx = int(x0 + b.x * sx)
+            ry = int(y0 + b.y * sy)
+            pygame.draw.circle(surface, (220, 220, 230), (rx, ry), 2)
+
+        # Label
+        surface.blit(self.label, (x0 + 6, y0 - 18))
+
+
+# Map generation. A map is fully determined by its seed, so hosts only need to send
+# the seed; a background thread generates upcoming maps before rounds need them
+MAP_CACHE_LIMIT = 64
+MAP_PREFETCH = 4  # upcoming map seeds a simulation keeps generated ahead of time
+
+_MAP_CACHE: OrderedDict[int, list[tuple[int, int, int, int]]] = OrderedDict()
+_MAP_CACHE_LOCK = threading.Lock()
+
+
+def _build_map(seed: int) -> list[tuple[int, int, int, int]]:
+    rng = random.Random(seed)
+    grid = WallGrid()
+    rects: list[tuple[int, int, int, int]] = []
+    # Outer border gaps
+    margin = 40
+    # Middle maze-like blocks without overlaps
+    count = rng.randint(WALL_MIN_COUNT, WALL_MAX_COUNT)
+    spawn_left = pygame.Rect(20, WINDOW_HEIGHT // 2 - 80, 140, 160)
+    spawn_right = pygame.Rect(WINDOW_WIDTH - 160, WINDOW_HEIGHT // 2 - 80, 140, 160)
+
+    max_attempts = count * 60
+    attempts = 0
+    while len(rects) < count and attempts < max_attempts:
+        attempts += 1
+        w = rng.randint(80, 160)
+        h = rng.randint(20, 120)
+        x = rng.randint(margin, WINDOW_WIDTH - margin - w)
+        y = rng.randint(margin, WINDOW_HEIGHT - margin - h)
+        rect = pygame.Rect(x, y, w, h)
+
+        # Check spawn zones and spacing against placed walls
+        inflated = rect.inflate(WALL_SPACING * 2, WALL_SPACING * 2)
+        if inflated.colliderect(spawn_left) or inflated.colliderect(spawn_right):
+            continue
+        if any(inflated.colliderect(existing.rect) for existing in grid.query(inflated)):
+            continue
+        grid.insert(Wall(rect))
+        rects.append((x, y, w, h))
+    return rects
+
+
+# Map validation: walls are rasterized onto a coarse grid of possible tank centers
+# (walls grown by half a tank), then a flood fill from one spawn gives reachability
+# and a distance field. Maps where the spawns can't reach each other, where free
+# space is sealed off, or where the route is a long detour are rejected
+MAP_CELL = 10
+MAP_MAX_SEALED = 0.01  # fraction of free tank positions allowed to be unreachable
+MAP_MAX_DETOUR = 2.5  # path length over straight-line distance between spawns
+MAP_MAX_CANDIDATES = 16
+MAP_RANKED_CANDIDATES = 3  # valid layouts compared by score before one is picked
+# Used when no candidate passes: a center block gives cover and the routes around it stay short
+MAP_FALLBACK = ((420, 240, 60, 120), (200, 100, 120, 40), (580, 460, 120, 40))
+
+
+@dataclass
+class MapReport:
+    valid: bool
+    reachable: bool
+    sealed_fraction: float
+    path_length: float  # px along the grid, 0 if unreachable
+    detour: float
+    spawn_los: bool  # spawns can see each other (no cover between them)
+    score: float  # higher is better; 0 for invalid maps
+
+
+def _raster(rects: list[tuple[int, int, int, int]], grow_x: int, grow_y: int, cols: int, rows: int) -> bytearray:
+    # 1 marks cells whose center lies inside a wall grown by (grow_x, grow_y)
+    grid = bytearray(cols * rows)
+    c = MAP_CELL
+    for (x, y, w, h) in rects:
+        # Cell i covers centers at i * c + c / 2
+        c0 = max(0, (x - grow_x - c // 2) // c + 1)
+        c1 = min(cols, (x + w + grow_x - c // 2 - 1) // c + 1)
+        r0 = max(0, (y - grow_y - c // 2) // c + 1)
+        r1 = min(rows, (y + h + grow_y - c // 2 - 1) // c + 1)
+        if c1 <= c0:
+            continue
+        run = b"\x01" * (c1 - c0)
+        for r in range(r0, r1):
+            grid[r * cols + c0:r * cols + c1] = run
+    return grid
+
+
+def analyze_map(rects: list[tuple[int, int, int, int]]) -> MapReport:
+    c = MAP_CELL
+    cols, rows = WINDOW_WIDTH // c, WINDOW_HEIGHT // c
+    half_w, half_h = TANK_SIZE[0] // 2, TANK_SIZE[1] // 2
+    blocked = _raster(rects, half_w, half_h, cols, rows)
+    # Tank centers closer than half a tank to the border are off-limits too
+    edge_c, edge_r = -(-half_w // c), -(-half_h // c)
+    for r in range(rows):
+        if r < edge_r or r >= rows - edge_r:
+            blocked[r * cols:(r + 1) * cols] = b"\x01" * cols
+        else:
+            blocked[r * cols:r * cols + edge_c] = b"\x01" * edge_c
+            blocked[(r + 1) * cols - edge_c:(r + 1) * cols] = b"\x01" * edge_c
+
+    (x1, y1), (x2, y2) = SPAWN_POSITIONS
+    start = ((y1 + half_h) // c) * cols + (x1 + half_w) // c
+    goal = ((y2 + half_h) // c) * cols + (x2 + half_w) // c
+    # Breadth-first distance field over free cells (4-connected). The blocked border
+    # means neighbours of a free cell never wrap around or leave the grid
+    free = blocked.count(0)
+    seen = bytearray(blocked)
+    goal_dist = -1
+    reached = 0
+    if not seen[start]:
+        seen[start] = 1
+        frontier = [start]
+        d = 0
+        while frontier:
+            reached += len(frontier)
+            d += 1
+            nxt = []
+            for i in frontier:
+                for j in (i - cols, i + cols, i - 1, i + 1):
+                    if not seen[j]:
+                        seen[j] = 1
+                        nxt.append(j)
+            frontier = nxt
+            if goal_dist < 0 and seen[goal] and not blocked[goal]:
+                goal_dist = d
+
+    sealed = (free - reached) / free if free else 1.0
+    reachable = goal_dist >= 0
+    path = goal_dist * c if reachable else 0.0
+    straight = max(1.0, ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5)
+    detour = path / straight if reachable else float("inf")
+
+    # Line of sight between the spawn centers, against the walls themselves
+    walls = _raster(rects, 0, 0, cols, rows)
+    steps = int(straight // (c / 2)) + 1
+    spawn_los = True
+    for k in range(steps + 1):
+        px = x1 + half_w + (x2 - x1) * k / steps
+        py = y1 + half_h + (y2 - y1) * k / steps
+        if walls[min(rows - 1, int(py) // c) * cols + min(cols - 1, int(px) // c)]:
+            spawn_los = False
+            break
+
+    valid = reachable and sealed <= MAP_MAX_SEALED and detour <= MAP_MAX_DETOUR
+    # Prefer maps with cover between the spawns and a direct route
+    score = ((0.5 if spawn_los else 1.0) / detour) if valid else 0.0
+    return MapReport(valid, reachable, sealed, path, detour, spawn_los, score)
+
+
+def generate_map(seed: int) -> list[tuple[int, int, int, int]]:
+    # Wall rects (x, y, w, h) for a map seed; the same seed always gives the same map.
+    # Candidate layouts come from a seeded stream; the best scoring of the first
+    # MAP_RANKED_CANDIDATES that pass analyze_map wins (the first one on a tie)
+    seed &= 0xFFFFFFFF
+    with _MAP_CACHE_LOCK:
+        rects = _MAP_CACHE.get(seed)
+        if rects is not None:
+            _MAP_CACHE.move_to_end(seed)
+            return rects
+    candidates = random.Random(seed)
+    best, best_score, ranked = list(MAP_FALLBACK), 0.0, 0
+    for _ in range(MAP_MAX_CANDIDATES):
+        candidate = _build_map(candidates.getrandbits(32))
+        report = analyze_map(candidate)
+        if not report.valid:
+            continue
+        if report.score > best_score:
+            best, best_score = candidate, report.score
+        ranked += 1
+        if ranked == MAP_RANKED_CANDIDATES:
+            break
+    rects = best
+    with _MAP_CACHE_LOCK:
+        _MAP_CACHE[seed] = rects
+        while len(_MAP_CACHE) > MAP_CACHE_LIMIT:
+            _MAP_CACHE.popitem(last=False)
+    return rects
+
+
+class MapPool:
+    # Background generator: prefetch(seed) queues a map, generate_map(seed) then finds
+    # it in the cache. The thread starts on first use (and again after a fork)
+    def __init__(self) -> None:
+        self._queue: queue.Queue[int] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def prefetch(self, seed: int) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put(seed)
+
+    def _run(self) -> None:
+        while True:
+            generate_map(self._queue.get())
+
+
+MAP_POOL = MapPool()
+
+
+def _sim_field(name: str) -> property:
+    # Game exposes simulation state under its historical attribute names
+    return property(lambda self: getattr(self.sim, name), lambda self, value: setattr(self.sim, name, value))
+
+
+class Simulation:
+    # Headless, fixed-timestep game core: no display, audio or wall clock.
+    # step() advances one tick and returns the events that happened during it,
+    # e.g. ("shot", tank), ("impact", x, y), ("shield_hit", x, y),
+    # ("tank_destroyed", x, y, shooter), ("powerup", tank, kind), ("round_reset",),
+    # ("round_start",) when the countdown ends
+    def __init__(self, seed: int | None = None, clock=None, prefetch: bool = True) -> None:
+        self.rng = random.Random(seed)
+        # Generate upcoming maps in the background; off for a client's placeholder world,
+        # which always rebuilds the host's maps from their seeds
+        self.prefetch = prefetch
+        self.tick = 0
+        # Buffs read time through this clock; defaults to simulated time
+        self.clock = clock or self.now_ms
         self.walls: list[Wall] = []
+        self.wall_grid = WallGrid()
+        self.map_version = 0
         self.bullets: list[Bullet] = []
-        self.particles: list[Particle] = []
-        self.shake_frames = 0
-        self.shake_strength = 0
-        self.explosions: list[Explosion] = []  # defined below
-        self.round_end_timer = 0
-        self.tank1_destroyed = False
-        self.tank2_destroyed = False
         self.powerups: list[PowerUp] = []
         self.powerup_spawn_cooldown = int(FPS * 4)
-        self.music_enabled = True
-        # Audio/SFX
-        self.sfx: dict[str, pygame.mixer.Sound] | None = None
-        self.engine_ch1: pygame.mixer.Channel | None = None
-        self.engine_ch2: pygame.mixer.Channel | None = None
-        # UX and audio defaults must be set before audio init
-        self.is_paused = False
-        self.music_volume = 0.04
-        self.sfx_volume = 0.30
-
-        try:
-            self._init_music()
-            self._prepare_sfx()
-        except Exception:
-            # Safe fallbacks if audio init fails
-            self.music_enabled = False
-            self.sfx = {}
-        Game._instance = self
-
-        # Networking
-        self.net_role = net_role  # 'host', 'client', or None
-        self.net = net
-        self.remote_input = {"up": False, "down": False, "left": False, "right": False, "fire": False}
-        self._remote_last_ms = 0
-
-        # UX and polish (rest)
+        self.round_end_timer = 0
         self.countdown_frames = 0
-        self.tread_decals: list[tuple[int, int, int, int]] = []  # x, y, life, alpha
-        self.toast_text = ""
-        self.toast_ms_until = 0
+        self.tank1_destroyed = False
+        self.tank2_destroyed = False
+        self.events: list[tuple] = []
+        # Source of stable entity IDs for walls, bullets and powerups
+        self._next_id = 0
+        self.map_seed = 0
+        self.map_first_id = 0
+        self._map_seeds: deque[int] = deque()
+        # Navigation grid for bots, built on first use and shared by all of them
+        self._nav: NavGrid | None = None
 
         self.tank1 = Tank(
             60,
@@ -444,116 +1357,508 @@ class Game:
             COLOR_BULLET_2,
             Controls(up=pygame.K_UP, down=pygame.K_DOWN, left=pygame.K_LEFT, right=pygame.K_RIGHT, fire=pygame.K_RCTRL),
         )
+        self.tank1.clock = self.clock
+        self.tank2.clock = self.clock
 
         self.reset_round(generate_new_map=True)
-        # Precompute vignette and background gradient
-        self._vignette = make_vignette((WINDOW_WIDTH, WINDOW_HEIGHT))
-        self._bg_grad = self._make_bg_gradient()
+
+    def now_ms(self) -> int:
+        return self.tick * 1000 // TICK_RATE
+
+    def nav_grid(self) -> "NavGrid":
+        if self._nav is None:
+            self._nav = NavGrid()
+        self._nav.sync(self.walls, self.map_version)
+        return self._nav
+
+    def new_id(self) -> int:
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF or 1
+        return self._next_id
 
     def reset_round(self, generate_new_map: bool) -> None:
         if generate_new_map:
             self._generate_walls()
         # Place tanks at opposite sides
-        self.tank1.reset_position(60, WINDOW_HEIGHT // 2 - TANK_SIZE[1] // 2)
-        self.tank2.reset_position(WINDOW_WIDTH - 60 - TANK_SIZE[0], WINDOW_HEIGHT // 2 - TANK_SIZE[1] // 2)
+        self.tank1.reset_position(*SPAWN_POSITIONS[0])
+        self.tank2.reset_position(*SPAWN_POSITIONS[1])
         self.bullets.clear()
-        # Keep particles to allow impact effects to linger across rounds
-        self.explosions.clear()
         self.round_end_timer = 0
         self.tank1_destroyed = False
         self.tank2_destroyed = False
         self.powerups.clear()
         self.powerup_spawn_cooldown = int(FPS * 2)
-        # Immediately push a fresh state to client after reset
-        if self.net_role == 'host' and self.net:
-            self.net.broadcast_state(self._build_state_snapshot())
         # Round start countdown
         self.countdown_frames = int(2 * FPS)
 
     def _generate_walls(self) -> None:
-        random.seed()
+        # Map seeds come from our rng in order, so a simulation seed fixes every map;
+        # the next few are generated in the background before they are needed
+        while len(self._map_seeds) <= MAP_PREFETCH:
+            seed = self.rng.getrandbits(32)
+            self._map_seeds.append(seed)
+            if self.prefetch:
+                MAP_POOL.prefetch(seed)
+        self.load_map(self._map_seeds.popleft())
+
+    def load_map(self, seed: int) -> None:
         self.walls.clear()
+        self.wall_grid.clear()
+        self.map_version += 1
+        self.map_seed = seed
+        self.map_first_id = 0
+        for (x, y, w, h) in generate_map(seed):
+            wall = Wall(pygame.Rect(x, y, w, h))
+            wall.id = self.new_id()
+            # Wall IDs of a map are consecutive, so (seed, first ID) describes it fully
+            self.map_first_id = self.map_first_id or wall.id
+            self.walls.append(wall)
+            self.wall_grid.insert(wall)
+
+    def step(self, inputs: tuple[TankInput, TankInput]) -> list[tuple]:
+        self.events = []
+        # Consumed even while frozen, so predicting clients can drop them from their history
+        self.tank1.input_seq = inputs[0].seq
+        self.tank2.input_seq = inputs[1].seq
+        active = self.round_end_timer == 0 and self.countdown_frames == 0
+        # Freeze movement and firing during the countdown and end animation
+        if active:
+            for tank, inp in ((self.tank1, inputs[0]), (self.tank2, inputs[1])):
+                tank.apply_input(inp, self.walls, self.wall_grid)
+                if inp.fire:
+                    bullet = tank.fire()
+                    if bullet:
+                        bullet.id = self.new_id()
+                        self.bullets.append(bullet)
+                        self.events.append(("shot", tank))
 
-        # Outer border gaps
-        margin = 40
-        # Middle maze-like blocks without overlaps
-        count = random.randint(WALL_MIN_COUNT, WALL_MAX_COUNT)
-        spawn_left = pygame.Rect(20, WINDOW_HEIGHT // 2 - 80, 140, 160)
-        spawn_right = pygame.Rect(WINDOW_WIDTH - 160, WINDOW_HEIGHT // 2 - 80, 140, 160)
-
-        max_attempts = count * 60
-        attempts = 0
-        while len(self.walls) < count and attempts < max_attempts:
-            attempts += 1
-            w = random.randint(80, 160)
-            h = random.randint(20, 120)
-            x = random.randint(margin, WINDOW_WIDTH - margin - w)
-            y = random.randint(margin, WINDOW_HEIGHT - margin - h)
-            rect = pygame.Rect(x, y, w, h)
-
-            # Check spawn zones and spacing against existing walls
-            inflated = rect.inflate(WALL_SPACING * 2, WALL_SPACING * 2)
-            if inflated.colliderect(spawn_left) or inflated.colliderect(spawn_right):
-                continue
-
-            overlaps = False
-            for existing in self.walls:
-                if inflated.colliderect(existing.rect):
-                    overlaps = True
-                    break
-            if overlaps:
-                continue
+            # Update bullets
+            for bullet in self.bullets:
+                pre_active = bullet.is_active
+                bullet.update(self.walls, self.wall_grid)
+                # Impact with wall: deactivation = hit
+                if pre_active and not bullet.is_active:
+                    self.events.append(("impact", bullet.x, bullet.y))
+
+        if self.countdown_frames == 0:
+            self.handle_bullet_collisions()
+
+        # PowerUps
+        self._maybe_spawn_powerup()
+        for pu in list(self.powerups):
+            pu.update()
+            # Pickups
+            for tank in (self.tank1, self.tank2):
+                if not (self.tank1_destroyed and tank is self.tank1) and not (self.tank2_destroyed and tank is self.tank2):
+                    if pu.rect.colliderect(tank.rect):
+                        pu.apply(tank)
+                        self.events.append(("powerup", tank, pu.kind))
+                        try:
+                            self.powerups.remove(pu)
+                        except ValueError:
+                            pass
+                        break
+
+        # End-of-round timing
+        if self.round_end_timer > 0:
+            self.round_end_timer -= 1
+            if self.round_end_timer == 0:
+                self.reset_round(generate_new_map=True)
+                self.events.append(("round_reset",))
+        if self.countdown_frames > 0:
+            self.countdown_frames -= 1
+            if self.countdown_frames == 0:
+                self.events.append(("round_start",))
 
-            self.walls.append(Wall(rect))
+        self.tick += 1
+        return self.events
 
     def handle_bullet_collisions(self) -> None:
         # Remove inactive bullets
         self.bullets = [b for b in self.bullets if b.is_active]
 
-        # Tank collisions
-        for bullet in list(self.bullets):
-            if not bullet.is_active:
-                continue
-            bullet_rect = bullet.get_rect()
-            if self.round_end_timer == 0 and bullet_rect.colliderect(self.tank1.rect) and bullet.color == COLOR_BULLET_2:
-                hit_x, hit_y = self.tank1.rect.centerx, self.tank1.rect.centery
+        # Tank collisions. Both tanks are checked against the same bullets, so two
+        # bullets landing in one tick (a mirror trade) are a mutual kill with no point
+        # scored, not a win for whichever tank happens to be checked first
+        if self.round_end_timer:
+            return
+        killed = [False, False]
+        for idx, (victim, shooter, enemy_color) in enumerate(
+            ((self.tank1, self.tank2, COLOR_BULLET_2), (self.tank2, self.tank1, COLOR_BULLET_1))
+        ):
+            for bullet in self.bullets:
+                if not bullet.is_active or bullet.color != enemy_color or not bullet.get_rect().colliderect(victim.rect):
+                    continue
+                hit_x, hit_y = victim.rect.centerx, victim.rect.centery
                 bullet.is_active = False
                 # Shield blocks one hit
-                if tank_has_buff(self.tank1, "buff_shield_until"):
-                    setattr(self.tank1, "buff_shield_until", 0)
-                    self._spawn_hit_effect(hit_x, hit_y, (120, 200, 255))
-                    self._shake(6, 10)
+                if tank_has_buff(victim, "buff_shield_until"):
+                    setattr(victim, "buff_shield_until", 0)
+                    self.events.append(("shield_hit", hit_x, hit_y))
                 else:
-                    self._spawn_tank_explosion(hit_x, hit_y)
-                    self._spawn_hit_effect(hit_x, hit_y, self.tank2.color)
-                    self._shake(10, 14)
-                    self.tank2.score += 1
-                    self.tank1_destroyed = True
-                    self.round_end_timer = int(FPS * 1.0)
-                break
-            if self.round_end_timer == 0 and bullet_rect.colliderect(self.tank2.rect) and bullet.color == COLOR_BULLET_1:
-                hit_x, hit_y = self.tank2.rect.centerx, self.tank2.rect.centery
-                bullet.is_active = False
-                if tank_has_buff(self.tank2, "buff_shield_until"):
-                    setattr(self.tank2, "buff_shield_until", 0)
-                    self._spawn_hit_effect(hit_x, hit_y, (120, 200, 255))
-                    self._shake(6, 10)
-                else:
-                    self._spawn_tank_explosion(hit_x, hit_y)
-                    self._spawn_hit_effect(hit_x, hit_y, self.tank1.color)
-                    self._shake(10, 14)
-                    self.tank1.score += 1
-                    self.tank2_destroyed = True
-                    self.round_end_timer = int(FPS * 1.0)
+                    self.events.append(("tank_destroyed", hit_x, hit_y, shooter))
+                    killed[idx] = True
                 break
+        if not any(killed):
+            return
+        self.tank1_destroyed, self.tank2_destroyed = killed
+        if killed != [True, True]:
+            (self.tank2 if killed[0] else self.tank1).score += 1
+        self.round_end_timer = int(FPS * 1.0)
+
+    def _maybe_spawn_powerup(self) -> None:
+        if self.round_end_timer > 0:
+            return
+        if self.powerup_spawn_cooldown > 0:
+            self.powerup_spawn_cooldown -= 1
+            return
+        rng = self.rng
+        # Try to spawn not overlapping walls/spawns
+        margin = 40
+        w, h = 26, 26
+        for _ in range(30):
+            x = rng.randint(margin, WINDOW_WIDTH - margin - w)
+            y = rng.randint(margin, WINDOW_HEIGHT - margin - h)
+            rect = pygame.Rect(x, y, w, h)
+            if rect.colliderect(self.tank1.rect.inflate(80, 80)) or rect.colliderect(self.tank2.rect.inflate(80, 80)):
+                continue
+            blocked = False
+            for wall in self.wall_grid.query(rect.inflate(12, 12)):
+                if rect.colliderect(wall.rect.inflate(12, 12)):
+                    blocked = True
+                    break
+            if blocked:
+                continue
+            kind = rng.choice(PowerUp.TYPES)
+            pu = PowerUp(rect, kind)
+            pu.id = self.new_id()
+            self.powerups.append(pu)
+            self.powerup_spawn_cooldown = int(FPS * rng.uniform(5, 10))
+            break
+
+
+def build_state_snapshot(sim: Simulation, t: int) -> dict:
+    return {
+        'type': 'state',
+        't': t,
+        'scores': [sim.tank1.score, sim.tank2.score],
+        'countdown': sim.countdown_frames,
+        'round_end': sim.round_end_timer,
+        'map': [sim.map_seed, sim.map_first_id],
+        'tanks': [
+            {'x': sim.tank1.rect.x, 'y': sim.tank1.rect.y, 'alive': not sim.tank1_destroyed, 'n': sim.tank1.input_seq,
+             'buffs': buff_remaining(sim.tank1)},
+            {'x': sim.tank2.rect.x, 'y': sim.tank2.rect.y, 'alive': not sim.tank2_destroyed, 'n': sim.tank2.input_seq,
+             'buffs': buff_remaining(sim.tank2)},
+        ],
+        'bullets': [{'id': b.id, 'x': b.x, 'y': b.y, 'dx': b.dx, 'dy': b.dy, 'c': (1 if b.color == COLOR_BULLET_1 else 2)} for b in sim.bullets if b.is_active],
+        'walls': [[w.id, w.rect.x, w.rect.y, w.rect.width, w.rect.height, w.hp] for w in sim.walls],
+        'powerups': [[pu.id, pu.rect.x, pu.rect.y, pu.rect.width, pu.rect.height, pu.kind] for pu in sim.powerups],
+    }
+
+
+NAV_CELL = 20
+BOT_STUCK_TICKS = 20
+BOT_UNSTICK_TICKS = 15
+BOT_REACTION_TICKS = (4, 14)  # ticks a bot takes to pull the trigger once it has a line of fire
+
+
+class NavGrid:
+    # Coarse grid of possible tank centers for bots. Each cell counts the walls (grown
+    # by half a tank) covering it, so destroying a wall only touches the cells under it
+    def __init__(self, cell: int = NAV_CELL) -> None:
+        self.cell = cell
+        self.cols = WINDOW_WIDTH // cell
+        self.rows = WINDOW_HEIGHT // cell
+        # Border cells are permanently covered: searches never need bounds checks
+        self._border = bytearray(self.cols * self.rows)
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if r in (0, self.rows - 1) or c in (0, self.cols - 1):
+                    self._border[r * self.cols + c] = 1
+        self.cover = bytearray(self._border)
+        # Bumped on every change; cached flow fields compare against it
+        self.version = 0
+        self._walls: dict[int, pygame.Rect] = {}
+        self._map_version = -1
+        self._fields: OrderedDict[tuple[int, int], list[int]] = OrderedDict()
+
+    def _cover(self, rect: pygame.Rect, delta: int) -> None:
+        c, cols = self.cell, self.cols
+        half_w, half_h = TANK_SIZE[0] // 2, TANK_SIZE[1] // 2
+        # Same center-inside-grown-rect rule as the map analysis raster
+        c0 = max(0, (rect.x - half_w - c // 2) // c + 1)
+        c1 = min(cols, (rect.right + half_w - c // 2 - 1) // c + 1)
+        r0 = max(0, (rect.y - half_h - c // 2) // c + 1)
+        r1 = min(self.rows, (rect.bottom + half_h - c // 2 - 1) // c + 1)
+        cover = self.cover
+        for r in range(r0, r1):
+            for i in range(r * cols + c0, r * cols + c1):
+                cover[i] += delta
+
+    def sync(self, walls: list[Wall], map_version: int) -> None:
+        # Full rebuild on a new map; otherwise only uncover destroyed walls
+        if map_version != self._map_version:
+            self._map_version = map_version
+            self.cover = bytearray(self._border)
+            self._walls = {}
+            for wall in walls:
+                self._walls[wall.id] = wall.rect.copy()
+                self._cover(wall.rect, 1)
+            self.version += 1
+            self._fields.clear()
+        elif len(walls) != len(self._walls):
+            alive = {wall.id for wall in walls}
+            for wid in [wid for wid in self._walls if wid not in alive]:
+                self._cover(self._walls.pop(wid), -1)
+            for wall in walls:
+                if wall.id not in self._walls:
+                    self._walls[wall.id] = wall.rect.copy()
+                    self._cover(wall.rect, 1)
+            self.version += 1
+            self._fields.clear()
+
+    def cell_of(self, x: float, y: float) -> int:
+        # Clamped to the interior so searches can start from any tank position
+        col = min(self.cols - 2, max(1, int(x) // self.cell))
+        row = min(self.rows - 2, max(1, int(y) // self.cell))
+        return row * self.cols + col
+
+    def cell_center(self, idx: int) -> tuple[int, int]:
+        c = self.cell
+        return (idx % self.cols) * c + c // 2, (idx // self.cols) * c + c // 2
+
+    def flow_field(self, *targets: int) -> list[int]:
+        # Steps from every free cell to the nearest target (-1 = unreachable), cached
+        # per target set until the grid changes
+        key = (targets, self.version)
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            return field
+        cols = self.cols
+        field = [-1] * len(self.cover)
+        seen = bytearray(self.cover)
+        for target in targets:
+            field[target] = 0
+            seen[target] = 1
+        frontier = list(targets)
+        d = 0
+        while frontier:
+            d += 1
+            nxt = []
+            for i in frontier:
+                for j in (i - cols, i + cols, i - 1, i + 1):
+                    if not seen[j]:
+                        seen[j] = 1
+                        field[j] = d
+                        nxt.append(j)
+            frontier = nxt
+        self._fields[key] = field
+        while len(self._fields) > 8:
+            self._fields.popitem(last=False)
+        return field
+
+
+def line_of_fire(shooter: Tank, target: Tank, grid: WallGrid) -> tuple[int, int] | None:
+    # Direction (dx, dy) in which a bullet from shooter would reach target unobstructed
+    sx, sy = shooter.rect.center
+    tx, ty = target.rect.center
+    if abs(ty - sy) < target.rect.height // 2 + BULLET_RADIUS:
+        lane = pygame.Rect(min(sx, tx), sy - BULLET_RADIUS, abs(tx - sx), BULLET_RADIUS * 2)
+        direction = (1 if tx > sx else -1, 0)
+    elif abs(tx - sx) < target.rect.width // 2 + BULLET_RADIUS:
+        lane = pygame.Rect(sx - BULLET_RADIUS, min(sy, ty), BULLET_RADIUS * 2, abs(ty - sy))
+        direction = (0, 1 if ty > sy else -1)
+    else:
+        return None
+    for wall in grid.query(lane):
+        if lane.colliderect(wall.rect):
+            return None
+    return direction
+
+
+class Bot:
+    # Scripted player: follows a flow field toward the opponent and shoots when it has
+    # a clear line along one axis. think() returns the same TankInput a remote or
+    # local player produces, once per simulation tick
+    def __init__(self, player: int, seed: int | None = None) -> None:
+        self.player = player
+        self.rng = random.Random(seed)
+        self._last_pos: tuple[int, int] | None = None
+        self._stuck_ticks = 0
+        self._unstick_ticks = 0
+        self._unstick_dir = (0, 0)
+        # Ticks spent aiming at the current line of fire, and how many it takes to shoot
+        self._aim_ticks = 0
+        self._reaction = self.rng.randint(*BOT_REACTION_TICKS)
+
+    def think(self, sim: Simulation) -> TankInput:
+        tanks = (sim.tank1, sim.tank2)
+        me, opp = tanks[self.player], tanks[1 - self.player]
+        if (sim.tank1_destroyed, sim.tank2_destroyed)[self.player] or sim.countdown_frames or sim.round_end_timer:
+            self._last_pos = None
+            return TankInput()
+
+        aim = line_of_fire(me, opp, sim.wall_grid)
+        if aim is not None:
+            # Turn toward the target right away; the trigger follows after a reaction
+            # time, so two bots lining up in the same tick rarely fire in the same tick
+            self._aim_ticks += 1
+            if self._aim_ticks < self._reaction:
+                return self._press(aim)
+            self._aim_ticks = 0
+            self._reaction = self.rng.randint(*BOT_REACTION_TICKS)
+            return self._press(aim, fire=True)
+        self._aim_ticks = 0
+
+        # Something (e.g. the other tank) keeps us in place: sidestep for a moment
+        if self._last_pos == me.rect.topleft:
+            self._stuck_ticks += 1
+        else:
+            self._stuck_ticks = 0
+        self._last_pos = me.rect.topleft
+        if self._stuck_ticks >= BOT_STUCK_TICKS:
+            self._stuck_ticks = 0
+            self._unstick_ticks = BOT_UNSTICK_TICKS
+            self._unstick_dir = self.rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+        if self._unstick_ticks:
+            self._unstick_ticks -= 1
+            return self._press(self._unstick_dir)
+
+        nav = sim.nav_grid()
+        field = nav.flow_field(nav.cell_of(*opp.rect.center))
+        cur = nav.cell_of(*me.rect.center)
+        # Go for the nearest powerup if it is closer than the opponent. One field leads
+        # to all of them, shared with the other bot until a powerup comes or goes
+        if sim.powerups:
+            pu_field = nav.flow_field(*sorted({nav.cell_of(*pu.rect.center) for pu in sim.powerups}))
+            if 0 <= pu_field[cur] and (field[cur] < 0 or pu_field[cur] < field[cur]):
+                field = pu_field
+        best, best_d = -1, field[cur] if field[cur] >= 0 else 1 << 30
+        for j in (cur - nav.cols, cur + nav.cols, cur - 1, cur + 1):
+            if 0 <= field[j] < best_d:
+                best, best_d = j, field[j]
+        if best < 0:
+            return TankInput()
+        tx, ty = nav.cell_center(best)
+        cx, cy = me.rect.center
+        dx = 0 if abs(tx - cx) <= 1 else (1 if tx > cx else -1)
+        dy = 0 if abs(ty - cy) <= 1 else (1 if ty > cy else -1)
+        return self._press((dx, dy))
+
+    @staticmethod
+    def _press(direction: tuple[int, int], fire: bool = False) -> TankInput:
+        dx, dy = direction
+        return TankInput(up=dy < 0, down=dy > 0, left=dx < 0, right=dx > 0, fire=fire)
+
+
+class Game:
+    _instance: "Game | None" = None
+
+    walls = _sim_field("walls")
+    wall_grid = _sim_field("wall_grid")
+    bullets = _sim_field("bullets")
+    powerups = _sim_field("powerups")
+    tank1 = _sim_field("tank1")
+    tank2 = _sim_field("tank2")
+    tank1_destroyed = _sim_field("tank1_destroyed")
+    tank2_destroyed = _sim_field("tank2_destroyed")
+    round_end_timer = _sim_field("round_end_timer")
+    countdown_frames = _sim_field("countdown_frames")
+
+    def __init__(
+        self,
+        net_role: str | None = None,
+        net: "NetManager | None" = None,
+        interp_delay_ms: int = INTERP_DELAY_MS,
+        bot: bool = False,
+    ) -> None:
+        pygame.init()
+        pygame.display.set_caption("Tanki 2D")
+        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.clock = pygame.time.Clock()
+        self.font = get_font(22)
+        self.small_font = get_font(14)
+        self.help_font = get_font(16)
+        self.title_font = get_font(48, bold=True)
+        self.countdown_font = get_font(64, bold=True)
+
+        # Gameplay state lives in the headless simulation; Game renders it and feeds inputs
+        self.sim = Simulation(prefetch=net_role != 'client')
+        self.particles = ParticleSystem()
+        self.shake_frames = 0
+        self.shake_strength = 0
+        self.explosions: list[Explosion] = []  # defined below
+        self.music_enabled = True
+        # Audio/SFX
+        self.sfx: dict[str, pygame.mixer.Sound] | None = None
+        self.engine_ch1: pygame.mixer.Channel | None = None
+        self.engine_ch2: pygame.mixer.Channel | None = None
+        # UX and audio defaults must be set before audio init
+        self.is_paused = False
+        self.music_volume = 0.04
+        self.sfx_volume = 0.30
+
+        try:
+            self._init_music()
+            self._prepare_sfx()
+        except Exception:
+            # Safe fallbacks if audio init fails
+            self.music_enabled = False
+            self.sfx = {}
+        Game._instance = self
+
+        # Networking
+        self.net_role = net_role  # 'host', 'client', or None
+        self.net = net
+        self.remote = RemoteInput()
+        # Local game against the computer: the bot drives player 2
+        self.bot = Bot(1) if bot and net_role is None else None
+        # Client: seq of the host snapshot currently applied to the world
+        self._net_applied_seq: int | None = None
+        # Client prediction: our tank index (from the host), sent inputs the host
+        # hasn't consumed yet, and the sequence number of the last input sent
+        self._net_player: int | None = None
+        self._input_history: deque[TankInput] = deque(maxlen=INPUT_HISTORY_TICKS)
+        self._input_seq = 0
+        # Client: buffs run on the tick of the input being predicted, matching the
+        # host's tick clock, instead of a simulation that never steps here
+        self._predict_seq = 0
+        if net_role == 'client':
+            self.sim.clock = self._predict_clock
+            self.tank1.clock = self.tank2.clock = self._predict_clock
+        # Key bitmasks of the latest sent frames, newest first, resent for redundancy
+        self._sent_masks: deque[int] = deque(maxlen=INPUT_REDUNDANCY - 1)
+        # Client: recent snapshots for drawing the remote tank and bullets smoothly
+        self.snapshot_buffer = SnapshotBuffer(delay_ms=interp_delay_ms)
+        # Local fire presses since the last simulation tick (so quick taps aren't lost)
+        self._fire_latch = [False, False]
+
+        # UX and polish (rest)
+        self.tread_decals: list[tuple[int, int, int, int]] = []  # x, y, life, alpha
+        self.toast_text = ""
+        self.toast_ms_until = 0
+
+        self.minimap = Minimap(self.small_font)
+        self._on_round_reset()
+        # Precompute the static background layer (gradient + grid + vignette)
+        self._bg_layer = make_background_layer((WINDOW_WIDTH, WINDOW_HEIGHT))
+        # Warm the tank explosion frames so the first kill doesn't hitch
+        get_explosion_frames(TANK_EXPLOSION_RADIUS, TANK_EXPLOSION_LIFE)
+
+    def reset_round(self, generate_new_map: bool) -> None:
+        self.sim.reset_round(generate_new_map)
+        self._on_round_reset()
+
+    def _on_round_reset(self) -> None:
+        # Keep particles to allow impact effects to linger across rounds
+        self.explosions.clear()
+        # Immediately push a fresh state to client after reset
+        if self.net_role == 'host' and self.net:
+            self.net.broadcast_state(self._build_state_snapshot(), force=True)
 
     def _spawn_hit_effect(self, x: float, y: float, color: tuple[int, int, int]) -> None:
-        for _ in range(18):
-            ang = random.uniform(0, 3.14159 * 2)
-            speed = random.uniform(1.5, 4.0)
-            vx = speed * pygame.math.Vector2(1, 0).rotate_rad(ang).x
-            vy = speed * pygame.math.Vector2(1, 0).rotate_rad(ang).y
-            self.particles.append(Particle(x, y, vx, vy, life=random.randint(18, 32), color=color))
+        self.particles.burst(x, y, 18, speed=(1.5, 4.0), life=(18, 32), colors=[color])
         # Scorch decal
         s = pygame.Surface((22, 22), pygame.SRCALPHA)
         pygame.draw.circle(s, (20, 20, 22, 90), (11, 11), 11)
@@ -566,13 +1871,11 @@ class Game:
 
     def _spawn_tank_explosion(self, x: float, y: float) -> None:
         # Big burst of particles + an expanding shockwave
-        for _ in range(40):
-            ang = random.uniform(0, 3.14159 * 2)
-            speed = random.uniform(1.0, 5.0)
-            v = pygame.math.Vector2(speed, 0).rotate_rad(ang)
-            col = random.choice([(250, 220, 120), (250, 170, 80), (255, 120, 80), (240, 240, 240)])
-            self.particles.append(Particle(x, y, v.x, v.y, life=random.randint(24, 40), color=col))
-        self.explosions.append(Explosion(x, y, max_radius=90, life=int(FPS * 0.6)))
+        self.particles.burst(
+            x, y, 40, speed=(1.0, 5.0), life=(24, 40),
+            colors=[(250, 220, 120), (250, 170, 80), (255, 120, 80), (240, 240, 240)],
+        )
+        self.explosions.append(Explosion(x, y, max_radius=TANK_EXPLOSION_RADIUS, life=TANK_EXPLOSION_LIFE))
         # Explosion SFX
         try:
             if self.sfx and "explosion" in self.sfx:
@@ -582,39 +1885,40 @@ class Game:
 
     def draw_hud(self) -> None:
         score_text = f"P1: {self.tank1.score}   P2: {self.tank2.score}"
-        text_surface = self.font.render(score_text, True, COLOR_TEXT)
+        text_surface = render_text(self.font, score_text, COLOR_TEXT)
         self.screen.blit(text_surface, (WINDOW_WIDTH // 2 - text_surface.get_width() // 2, 8))
 
         # Buff icons with remaining time bars
-        now = pygame.time.get_ticks()
-        def draw_buff(x: int, y: int, active: bool, color: tuple[int, int, int], remain_ms: int) -> int:
+        now = self.sim.clock()
+        def draw_buff(x: int, y: int, active: bool, color: tuple[int, int, int], remain_ms: int, kind: str) -> int:
             box = pygame.Rect(x, y, 70, 16)
             pygame.draw.rect(self.screen, (35, 35, 45), box, border_radius=6)
-            pygame.draw.rect(self.screen, color, (box.x + 3, box.y + 3, max(1, int((box.width - 6) * remain_ms / 5000)), box.height - 6), border_radius=4)
+            # Bar length is the fraction left of this kind's full duration
+            left = min(1.0, remain_ms / max(1, POWERUP_DURATION_MS.get(kind, 1)))
+            pygame.draw.rect(self.screen, color, (box.x + 3, box.y + 3, max(1, int((box.width - 6) * left)), box.height - 6), border_radius=4)
             return box.right + 8
 
         # Tank1 buffs
         bx = 12
         by = 10
         if tank_has_buff(self.tank1, "buff_shield_until"):
-            draw_buff(bx, by, True, (120, 200, 255), getattr(self.tank1, "buff_shield_until") - now)
+            draw_buff(bx, by, True, (120, 200, 255), getattr(self.tank1, "buff_shield_until") - now, "shield")
         if tank_has_buff(self.tank1, "buff_rapid_until"):
-            draw_buff(bx, by + 20, True, (255, 200, 120), getattr(self.tank1, "buff_rapid_until") - now)
+            draw_buff(bx, by + 20, True, (255, 200, 120), getattr(self.tank1, "buff_rapid_until") - now, "rapid")
         if tank_has_buff(self.tank1, "buff_speed_until"):
-            draw_buff(bx, by + 40, True, (160, 255, 160), getattr(self.tank1, "buff_speed_until") - now)
+            draw_buff(bx, by + 40, True, (160, 255, 160), getattr(self.tank1, "buff_speed_until") - now, "speed")
 
         # Tank2 buffs
         bx = WINDOW_WIDTH - 82
         if tank_has_buff(self.tank2, "buff_shield_until"):
-            draw_buff(bx, by, True, (120, 200, 255), getattr(self.tank2, "buff_shield_until") - now)
+            draw_buff(bx, by, True, (120, 200, 255), getattr(self.tank2, "buff_shield_until") - now, "shield")
         if tank_has_buff(self.tank2, "buff_rapid_until"):
-            draw_buff(bx, by + 20, True, (255, 200, 120), getattr(self.tank2, "buff_rapid_until") - now)
+            draw_buff(bx, by + 20, True, (255, 200, 120), getattr(self.tank2, "buff_rapid_until") - now, "rapid")
         if tank_has_buff(self.tank2, "buff_speed_until"):
-            draw_buff(bx, by + 40, True, (160, 255, 160), getattr(self.tank2, "buff_speed_until") - now)
+            draw_buff(bx, by + 40, True, (160, 255, 160), getattr(self.tank2, "buff_speed_until") - now, "speed")
 
         help_text = "WASD+Space | Arrows+RightCtrl | P: pause | M: music"
-        small_font = pygame.font.SysFont("consolas", 16)
-        help_surface = small_font.render(help_text, True, (180, 180, 195))
+        help_surface = render_text(self.help_font, help_text, (180, 180, 195))
         self.screen.blit(help_surface, (WINDOW_WIDTH // 2 - help_surface.get_width() // 2, WINDOW_HEIGHT - 24))
 
     def maybe_show_win_screen(self) -> bool:
@@ -623,12 +1927,10 @@ class Game:
             overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
             overlay.fill((0, 0, 0, 160))
             self.screen.blit(overlay, (0, 0))
-            big_font = pygame.font.SysFont("consolas", 48, bold=True)
-            title = big_font.render(winner_text, True, COLOR_TEXT)
+            title = render_text(self.title_font, winner_text, COLOR_TEXT)
             self.screen.blit(title, (WINDOW_WIDTH // 2 - title.get_width() // 2, WINDOW_HEIGHT // 2 - 80))
 
-            small_font = pygame.font.SysFont("consolas", 22)
-            tip = small_font.render("Press R to play again or Esc to quit", True, COLOR_TEXT)
+            tip = render_text(self.font, "Press R to play again or Esc to quit", COLOR_TEXT)
             self.screen.blit(tip, (WINDOW_WIDTH // 2 - tip.get_width() // 2, WINDOW_HEIGHT // 2 - 20))
             pygame.display.flip()
 
@@ -653,6 +1955,9 @@ class Game:
         return False
 
     def run(self) -> None:
+        tick_ms = 1000.0 / TICK_RATE
+        # Start with one tick pending so the first frame simulates
+        accumulator = tick_ms
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -672,15 +1977,9 @@ class Game:
                     if event.key == pygame.K_m:
                         self.toggle_music()
                     if event.key == self.tank1.controls.fire and (self.net_role != 'client'):
-                        bullet = self.tank1.fire()
-                        if bullet:
-                            self.bullets.append(bullet)
-                            self._play_shot_sfx()
+                        self._fire_latch[0] = True
                     if event.key == self.tank2.controls.fire and (self.net_role != 'host'):
-                        bullet = self.tank2.fire()
-                        if bullet:
-                            self.bullets.append(bullet)
-                            self._play_shot_sfx()
+                        self._fire_latch[1] = True
 
             pressed = pygame.key.get_pressed()
             if self.is_paused:
@@ -688,31 +1987,33 @@ class Game:
                 self._draw_pause_overlay()
                 pygame.display.flip()
                 self.clock.tick(30)
+                accumulator = 0.0
                 continue
-            # Freeze movement and firing during end animation
-            if self.round_end_timer == 0:
-                if self.net_role == 'client':
-                    # Client: don't simulate; host will send state
-                    pass
-                else:
-                    # Host or local: update Player 1 locally
-                    if self.countdown_frames == 0:
-                        self.tank1.update(pressed, self.walls)
-                    if self.net_role == 'host':
-                        # Update latest remote input snapshot from network
-                        self._net_poll_input()
-                        # Update tank2 from remote input
-                        if self.countdown_frames == 0:
-                            self._apply_remote_input_to_tank(self.tank2)
-                    else:
-                        # Local two-players
-                        if self.countdown_frames == 0:
-                            self.tank2.update(pressed, self.walls)
-            # Client receives new state frequently and rebuilds scene
+
             if self.net_role == 'client':
-                # Send input heartbeat every frame (even without movement)
-                self._net_send_input(pressed)
+                # Client: the host simulates; we send one input per tick and predict our own tank
+                steps = 0
+                while accumulator >= tick_ms and steps < MAX_TICKS_PER_FRAME:
+                    self._predict_local_tank(self._net_send_input(pressed))
+                    accumulator -= tick_ms
+                    steps += 1
+                if steps == MAX_TICKS_PER_FRAME:
+                    accumulator = min(accumulator, tick_ms)
                 self._net_apply_state_if_any()
+                self._net_interpolate_remote()
+                alpha = accumulator / tick_ms
+            else:
+                # Host or local: run as many fixed ticks as real time allows
+                steps = 0
+                while accumulator >= tick_ms and steps < MAX_TICKS_PER_FRAME:
+                    self._step_simulation(pressed)
+                    accumulator -= tick_ms
+                    steps += 1
+                if steps == MAX_TICKS_PER_FRAME:
+                    # Too far behind (e.g. window drag): drop the backlog instead of spiralling
+                    accumulator = min(accumulator, tick_ms)
+                alpha = accumulator / tick_ms
+
             # Engine SFX state
             moving1 = self.round_end_timer == 0 and not self.tank1_destroyed and (
                 pressed[self.tank1.controls.up] or pressed[self.tank1.controls.down] or pressed[self.tank1.controls.left] or pressed[self.tank1.controls.right]
@@ -722,89 +2023,98 @@ class Game:
             )
             self._update_engine_sfx(moving1, moving2)
 
-            # Update bullets
-            prev_states = {id(b): b.is_active for b in self.bullets}
-            for bullet in self.bullets:
-                if self.round_end_timer == 0 and self.net_role != 'client' and self.countdown_frames == 0:
-                    pre_active = bullet.is_active
-                    bullet.update(self.walls)
-                    # Impact with wall: deactivation = hit
-                    if pre_active and not bullet.is_active:
-                        self._spawn_hit_effect(bullet.x, bullet.y, (240, 200, 120))
-                        self._shake(3, 5)
-
-            if self.net_role != 'client' and self.countdown_frames == 0:
-                self.handle_bullet_collisions()
-
-            # Draw
-            self._draw_background()
-
-            # Screen shake offset
-            ox, oy = 0, 0
-            if self.shake_frames > 0:
-                ox = random.randint(-self.shake_strength, self.shake_strength)
-                oy = random.randint(-self.shake_strength, self.shake_strength)
-                self.shake_frames -= 1
-                self.shake_strength = max(self.shake_strength - 1, 0)
-
-            for wall in self.walls:
-                wall.draw(self.screen, ox, oy)
-            if not self.tank1_destroyed:
-                self.tank1.draw(self.screen, ox, oy)
-            if not self.tank2_destroyed:
-                self.tank2.draw(self.screen, ox, oy)
-            for bullet in self.bullets:
-                bullet.draw(self.screen, ox, oy)
-            # (tread decals removed by request)
-            # Particles
-            for p in list(self.particles):
-                p.update()
-                p.draw(self.screen, ox, oy)
-            self.particles = [p for p in self.particles if p.life > 0]
-            # Explosions
-            for e in list(self.explosions):
-                e.update()
-                e.draw(self.screen, ox, oy)
-            self.explosions = [e for e in self.explosions if e.life > 0]
-            # PowerUps
-            self._maybe_spawn_powerup()
-            for pu in list(self.powerups):
-                pu.update()
-                pu.draw(self.screen, ox, oy)
-                # Pickups
-                for tank in (self.tank1, self.tank2):
-                    if not (self.tank1_destroyed and tank is self.tank1) and not (self.tank2_destroyed and tank is self.tank2):
-                        if pu.rect.colliderect(tank.rect):
-                            pu.apply(tank)
-                            try:
-                                self.powerups.remove(pu)
-                            except ValueError:
-                                pass
-
+            self._draw_world(alpha)
             self.draw_hud()
             self._draw_minimap()
             if self.countdown_frames > 0:
                 self._draw_countdown()
 
-            # End-of-round timing
-            if self.net_role != 'client':
-                if self.round_end_timer > 0:
-                    self.round_end_timer -= 1
-                    if self.round_end_timer == 0:
-                        self.reset_round(generate_new_map=True)
-                if self.countdown_frames > 0:
-                    self.countdown_frames -= 1
-
             # Networking: host sends state snapshots
             if self.net_role == 'host':
                 self._net_broadcast_state_throttled()
 
             if self.maybe_show_win_screen():
                 # Win screen handles its own loop; after it returns, continue fresh frame
+                accumulator = tick_ms
                 continue
 
             pygame.display.flip()
-            self.clock.tick(FPS)
+            accumulator += self.clock.tick(FPS)
+
+    def _step_simulation(self, pressed: pygame.key.ScancodeWrapper) -> None:
+        # Player 1 is always local on host/local; player 2 is local or remote
+        inp1 = TankInput.from_pressed(pressed, self.tank1.controls, fire=self._fire_latch[0])
+        if self.net_role == 'host':
+            # Update latest remote input snapshot from network
+            self._net_poll_input()
+            inp2 = self.remote.to_tank_input()
+        elif self.bot:
+            inp2 = self.bot.think(self.sim)
+        else:
+            # Local two-players
+            inp2 = TankInput.from_pressed(pressed, self.tank2.controls, fire=self._fire_latch[1])
+        self._fire_latch = [False, False]
+        self._handle_sim_events(self.sim.step((inp1, inp2)))
+        # Visual effects advance at the simulation rate
+        self.particles.update()
+        for e in self.explosions:
+            e.update()
+        self.explosions = [e for e in self.explosions if e.life > 0]
+
+    def _handle_sim_events(self, events: list[tuple]) -> None:
+        for ev in events:
+            kind = ev[0]
+            if kind == "shot":
+                self._play_shot_sfx()
+            elif kind == "impact":
+                self._spawn_hit_effect(ev[1], ev[2], (240, 200, 120))
+                self._shake(3, 5)
+            elif kind == "shield_hit":
+                self._spawn_hit_effect(ev[1], ev[2], (120, 200, 255))
+                self._shake(6, 10)
+            elif kind == "tank_destroyed":
+                self._spawn_tank_explosion(ev[1], ev[2])
+                self._spawn_hit_effect(ev[1], ev[2], ev[3].color)
+                self._shake(10, 14)
+            elif kind == "round_reset":
+                self._on_round_reset()
+            elif kind == "round_start":
+                # Clients predict only once they see the countdown over: tell them now
+                if self.net_role == 'host' and self.net:
+                    self.net.broadcast_state(self._build_state_snapshot(), force=True)
+
+    def _draw_world(self, alpha: float = 1.0) -> None:
+        # Draw
+        self._draw_background()
+
+        # Screen shake offset
+        ox, oy = 0, 0
+        if self.shake_frames > 0:
+            ox = random.randint(-self.shake_strength, self.shake_strength)
+            oy = random.randint(-self.shake_strength, self.shake_strength)
+            self.shake_frames -= 1
+            self.shake_strength = max(self.shake_strength - 1, 0)
+
+        # Interpolate moving things between the last two simulation ticks
+        back = 1.0 - alpha
+        for wall in self.walls:
+            wall.draw(self.screen, ox, oy)
+        for destroyed, tank in ((self.tank1_destroyed, self.tank1), (self.tank2_destroyed, self.tank2)):
+            if not destroyed:
+                ix = int(round((tank.prev_pos[0] - tank.rect.x) * back))
+                iy = int(round((tank.prev_pos[1] - tank.rect.y) * back))
+                tank.draw(self.screen, ox + ix, oy + iy)
+        for bullet in self.bullets:
+            bullet.draw(self.screen, ox + int((bullet.prev_x - bullet.x) * back), oy + int((bullet.prev_y - bullet.y) * back))
+        # (tread decals removed by request)
+        # Particles
+        self.particles.draw(self.screen, ox, oy)
+        # Explosions
+        for e in self.explosions:
+            e.draw(self.screen, ox, oy)
+        # PowerUps
+        for pu in self.powerups:
+            pu.draw(self.screen, ox, oy)
 
     def _update_music_volume(self) -> None:
         try:
@@ -817,9 +2127,9 @@ class Game:
         overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 160))
         self.screen.blit(overlay, (0, 0))
-        title = self.font.render("Paused", True, (240, 240, 250))
+        title = render_text(self.font, "Paused", (240, 240, 250))
         self.screen.blit(title, (WINDOW_WIDTH // 2 - title.get_width() // 2, WINDOW_HEIGHT // 2 - 80))
-        tip = self.small_font.render("P: resume", True, (200, 205, 215))
+        tip = render_text(self.small_font, "P: resume", (200, 205, 215))
         self.screen.blit(tip, (WINDOW_WIDTH // 2 - tip.get_width() // 2, WINDOW_HEIGHT // 2 - 40))
 
     def _draw_countdown(self) -> None:
@@ -827,115 +2137,176 @@ class Game:
             return
         secs = max(1, (self.countdown_frames // FPS) + 1)
         txt = str(secs) if secs > 1 else "GO!"
-        big = pygame.font.SysFont("consolas", 64, bold=True)
-        s = big.render(txt, True, (250, 240, 180))
+        s = render_text(self.countdown_font, txt, (250, 240, 180))
         self.screen.blit(s, (WINDOW_WIDTH // 2 - s.get_width() // 2, WINDOW_HEIGHT // 2 - s.get_height() // 2))
 
     def _net_poll_input(self) -> None:
         if not self.net:
             return
-        msg = self.net.get_latest_input()
-        now = pygame.time.get_ticks()
-        if msg:
-            self.remote_input = {
-                'up': bool(msg.get('up', False)),
-                'down': bool(msg.get('down', False)),
-                'left': bool(msg.get('left', False)),
-                'right': bool(msg.get('right', False)),
-                'fire': bool(msg.get('fire', False)),
+        self.remote.poll(self.net.drain_inputs(), pygame.time.get_ticks())
+
+    def _net_send_input(self, pressed: pygame.key.ScancodeWrapper) -> TankInput:
+        # Either key set drives our tank, so the same client works in any dedicated server slot
+        c1, c2 = self.tank1.controls, self.tank2.controls
+        self._input_seq += 1
+        inp = TankInput(
+            up=bool(pressed[c2.up] or pressed[c1.up]),
+            down=bool(pressed[c2.down] or pressed[c1.down]),
+            left=bool(pressed[c2.left] or pressed[c1.left]),
+            right=bool(pressed[c2.right] or pressed[c1.right]),
+            seq=self._input_seq,
+        )
+        if self.net:
+            payload = {
+                'type': 'input',
+                'up': inp.up,
+                'down': inp.down,
+                'left': inp.left,
+                'right': inp.right,
+                'fire': bool(pressed[c2.fire] or pressed[c1.fire]),
+                'time': pygame.time.get_ticks(),
+                'n': inp.seq,
+                'prev': list(self._sent_masks),
             }
-            self._remote_last_ms = now
-        # If stale, treat as no input
-        if now - self._remote_last_ms > 500:
-            self.remote_input = {'up': False, 'down': False, 'left': False, 'right': False, 'fire': False}
-
-    def _apply_remote_input_to_tank(self, tank: "Tank") -> None:
-        # Build a pseudo pressed object for this tank from last network input
-        class P:
-            def __getitem__(self_inner, key: int) -> bool:
-                mapping = {
-                    tank.controls.up: self.remote_input.get('up', False),
-                    tank.controls.down: self.remote_input.get('down', False),
-                    tank.controls.left: self.remote_input.get('left', False),
-                    tank.controls.right: self.remote_input.get('right', False),
-                }
-                return mapping.get(key, False)
-
-        tank.update(P(), self.walls)
-        # Fire edge detection
-        now_fire = self.remote_input.get('fire', False)
-        prev_fire = getattr(self, '_prev_remote_fire', False)
-        if now_fire and not prev_fire:
-            bullet = tank.fire()
-            if bullet:
-                self.bullets.append(bullet)
-                self._play_shot_sfx()
-        self._prev_remote_fire = now_fire
+            self.net.send_input(payload)
+            self._sent_masks.appendleft(input_mask(payload))
+        return inp
 
-    def _net_send_input(self, pressed: pygame.key.ScancodeWrapper) -> None:
-        if not self.net:
-            return
-        payload = {
-            'type': 'input',
-            'up': bool(pressed[self.tank2.controls.up]),
-            'down': bool(pressed[self.tank2.controls.down]),
-            'left': bool(pressed[self.tank2.controls.left]),
-            'right': bool(pressed[self.tank2.controls.right]),
-            'fire': bool(pressed[self.tank2.controls.fire]),
-            'time': pygame.time.get_ticks(),
-        }
-        self.net.send_input(payload)
+    def _predicted_tank(self) -> Tank | None:
+        # Our own tank, if the host told us which one it is and it can move right now
+        if self._net_player not in (0, 1) or self.round_end_timer or self.countdown_frames:
+            return None
+        if (self.tank1_destroyed, self.tank2_destroyed)[self._net_player]:
+            return None
+        return (self.tank1, self.tank2)[self._net_player]
+
+    def _predict_clock(self) -> int:
+        return self._predict_seq * 1000 // TICK_RATE
+
+    def _predict_local_tank(self, inp: TankInput) -> None:
+        # Move our tank with the shared movement code right away instead of waiting
+        # a round trip for the host; firing stays authoritative on the host
+        self._input_history.append(inp)
+        self._predict_seq = inp.seq
+        tank = self._predicted_tank()
+        if tank is not None:
+            tank.apply_input(inp, self.walls, self.wall_grid)
+
+    def _reconcile_tank(self, tank: Tank, x: int, y: int, consumed: int) -> None:
+        # Rewind to the host's position, then replay the inputs it hasn't consumed yet
+        history = self._input_history
+        while history and history[0].seq <= consumed:
+            history.popleft()
+        tank.rect.topleft = (x, y)
+        tank.prev_pos = tank.rect.topleft
+        if self._predicted_tank() is tank:
+            for inp in history:
+                self._predict_seq = inp.seq
+                tank.apply_input(inp, self.walls, self.wall_grid)
+        self._predict_seq = self._input_seq
 
     def _net_broadcast_state_throttled(self) -> None:
-        if not self.net:
-            return
-        now = pygame.time.get_ticks()
-        last = getattr(self, '_last_broadcast_ms', 0)
-        if now - last < 50:  # 20 Hz
+        # The per-client rate controllers in NetManager decide who gets a snapshot
+        if not self.net or not self.net.snapshot_due():
             return
-        self._last_broadcast_ms = now
-        state = self._build_state_snapshot()
-        self.net.broadcast_state(state)
+        self.net.broadcast_state(self._build_state_snapshot())
 
     def _build_state_snapshot(self) -> dict:
-        return {
-            'type': 'state',
-            't': pygame.time.get_ticks(),
-            'scores': [self.tank1.score, self.tank2.score],
-            'tanks': [
-                {'x': self.tank1.rect.x, 'y': self.tank1.rect.y, 'alive': not self.tank1_destroyed},
-                {'x': self.tank2.rect.x, 'y': self.tank2.rect.y, 'alive': not self.tank2_destroyed},
-            ],
-            'bullets': [{'x': b.x, 'y': b.y, 'dx': b.dx, 'dy': b.dy, 'c': (1 if b.color == COLOR_BULLET_1 else 2)} for b in self.bullets if b.is_active],
-            'walls': [[w.rect.x, w.rect.y, w.rect.width, w.rect.height, w.hp] for w in self.walls],
-            'powerups': [[pu.rect.x, pu.rect.y, pu.rect.width, pu.rect.height, pu.kind] for pu in self.powerups],
-        }
+        return build_state_snapshot(self.sim, pygame.time.get_ticks())
 
     def _net_apply_state_if_any(self) -> None:
         if not self.net:
             return
+        # Every snapshot feeds the interpolation buffer; only the newest is applied
+        for snap in self.net.drain_states():
+            self.snapshot_buffer.push(snap, snap.get('rx_ms', _now_ms()))
         state = self.net.get_latest_state()
-        if not state:
+        if not state or state.get('seq') == self._net_applied_seq:
             return
-        # Apply scores and tanks
+        if self._net_applied_seq is None:
+            # First snapshot: IDs of our locally generated placeholder map mean nothing to the host
+            self.walls = []
+            self.wall_grid.clear()
+        self._net_applied_seq = state.get('seq')
+        # Walls: update by ID in place, create/destroy only what changed
+        old_walls = {w.id: w for w in self.walls}
+        walls = []
+        added = False
+        for (wid, x, y, w, h, hp) in state.get('walls', []):
+            wall = old_walls.pop(wid, None)
+            if wall is None:
+                wall = Wall(pygame.Rect(x, y, w, h))
+                wall.id = wid
+                self.wall_grid.insert(wall)
+                added = True
+            wall.hp = hp
+            walls.append(wall)
+        for wall in old_walls.values():
+            self.wall_grid.remove(wall)
+        if added:
+            self.sim.map_version += 1
+        if added or old_walls:
+            self.walls = walls
+        # Powerups
+        old_powerups = {pu.id: pu for pu in self.powerups}
+        powerups = []
+        for (pid, x, y, w, h, kind) in state.get('powerups', []):
+            pu = old_powerups.pop(pid, None)
+            if pu is None:
+                pu = PowerUp(pygame.Rect(x, y, w, h), kind)
+                pu.id = pid
+            powerups.append(pu)
+        self.powerups = powerups
+        # Bullets (visual only) come from the interpolation buffer, see _net_interpolate_remote
+        # Scores, round phase and tanks last, so reconciliation replays against current walls
         self.tank1.score, self.tank2.score = state.get('scores', [0, 0])
+        self.countdown_frames = state.get('countdown', 0)
+        self.round_end_timer = state.get('round_end', 0)
+        self._net_player = state.get('you')
         tks = state.get('tanks', [{}, {}])
-        self.tank1.rect.topleft = (tks[0].get('x', self.tank1.rect.x), tks[0].get('y', self.tank1.rect.y))
-        self.tank2.rect.topleft = (tks[1].get('x', self.tank2.rect.x), tks[1].get('y', self.tank2.rect.y))
         self.tank1_destroyed = not tks[0].get('alive', True)
         self.tank2_destroyed = not tks[1].get('alive', True)
-        # Walls rebuild
-        self.walls = [Wall(pygame.Rect(x, y, w, h), hp=hp) for (x, y, w, h, hp) in state.get('walls', [])]
-        # Powerups rebuild
-        self.powerups = []
-        for (x, y, w, h, kind) in state.get('powerups', []):
-            self.powerups.append(PowerUp(pygame.Rect(x, y, w, h), kind))
-        # Bullets rebuild (visual only)
-        self.bullets = []
-        for b in state.get('bullets', []):
-            color = COLOR_BULLET_1 if b.get('c', 1) == 1 else COLOR_BULLET_2
-            nb = Bullet(b['x'], b['y'], b.get('dx', 0), b.get('dy', 0), color)
-            self.bullets.append(nb)
+        for idx, (tank, tk) in enumerate(zip((self.tank1, self.tank2), tks)):
+            x, y = tk.get('x', tank.rect.x), tk.get('y', tank.rect.y)
+            # Buff time left counts from the host tick after the snapshot; for our own
+            # tank that is the tick that consumes the input after the last one it saw
+            if idx == self._net_player:
+                start = (tk.get('n', 0) + 1) * 1000 // TICK_RATE
+            else:
+                start = self._predict_clock()
+            for kind, left in zip(PowerUp.TYPES, tk.get('buffs', (0, 0, 0))):
+                setattr(tank, f"buff_{kind}_until", start + left if left else 0)
+            if idx == self._net_player:
+                self._reconcile_tank(tank, x, y, tk.get('n', 0))
+            else:
+                tank.rect.topleft = (x, y)
+                tank.prev_pos = tank.rect.topleft
+
+    def _net_interpolate_remote(self) -> None:
+        # Place the remote tank and all bullets at their buffered, slightly delayed positions
+        now = _now_ms()
+        buf = self.snapshot_buffer
+        for idx, tank in enumerate((self.tank1, self.tank2)):
+            if idx == self._net_player:
+                continue
+            pos = buf.tank_position(idx, now)
+            if pos is not None:
+                tank.rect.topleft = (int(round(pos[0])), int(round(pos[1])))
+                tank.prev_pos = tank.rect.topleft
+        # Exactly the bullets alive at render time, so they appear at the muzzle and
+        # vanish where they hit, in step with the delayed remote tank
+        old_bullets = {b.id: b for b in self.bullets}
+        bullets = []
+        for bid, (x, y, rec) in buf.bullet_positions(now).items():
+            bullet = old_bullets.get(bid)
+            if bullet is None:
+                color = COLOR_BULLET_1 if rec.get('c', 1) == 1 else COLOR_BULLET_2
+                bullet = Bullet(x, y, rec.get('dx', 0), rec.get('dy', 0), color)
+                bullet.id = bid
+            bullet.x, bullet.y = x, y
+            bullet.prev_x, bullet.prev_y = x, y
+            bullets.append(bullet)
+        self.bullets = bullets
 
     def _init_music(self) -> None:
         try:
@@ -1100,81 +2471,11 @@ class Game:
                 pass
 
     def _draw_background(self) -> None:
-        # Gradient
-        self.screen.blit(self._bg_grad, (0, 0))
-        # Subtle grid
-        spacing = 40
-        for x in range(0, WINDOW_WIDTH, spacing):
-            pygame.draw.line(self.screen, (26, 26, 30), (x, 0), (x, WINDOW_HEIGHT))
-        for y in range(0, WINDOW_HEIGHT, spacing):
-            pygame.draw.line(self.screen, (26, 26, 30), (0, y), (WINDOW_WIDTH, y))
-        # Vignette
-        self.screen.blit(self._vignette, (0, 0))
-
-    def _make_bg_gradient(self) -> pygame.Surface:
-        grad = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        top = pygame.Color(18, 22, 28)
-        bottom = pygame.Color(14, 16, 20)
-        for y in range(WINDOW_HEIGHT):
-            t = y / max(1, WINDOW_HEIGHT - 1)
-            c = (
-                int(top.r * (1 - t) + bottom.r * t),
-                int(top.g * (1 - t) + bottom.g * t),
-                int(top.b * (1 - t) + bottom.b * t),
-            )
-            pygame.draw.line(grad, c, (0, y), (WINDOW_WIDTH, y))
-        return grad
+        # Static layer: a single opaque blit, no per-pixel alpha
+        self.screen.blit(self._bg_layer, (0, 0))
 
     def _draw_minimap(self) -> None:
-        # Minimap constants
-        map_w, map_h = 200, 130
-        padding = 10
-        x0 = WINDOW_WIDTH - map_w - padding
-        y0 = WINDOW_HEIGHT - map_h - padding - 28
-        # Background
-        bg = pygame.Surface((map_w, map_h), pygame.SRCALPHA)
-        bg.fill((*COLOR_MINIMAP_BG, 200))
-        self.screen.blit(bg, (x0, y0))
-        pygame.draw.rect(self.screen, COLOR_MINIMAP_BORDER, (x0, y0, map_w, map_h), width=2, border_radius=6)
-
-        # Scale factors
-        sx = map_w / WINDOW_WIDTH
-        sy = map_h / WINDOW_HEIGHT
-
-        # Draw walls
-        for w in self.walls:
-            rx = int(x0 + w.rect.x * sx)
-            ry = int(y0 + w.rect.y * sy)
-            rw = max(1, int(w.rect.width * sx))
-            rh = max(1, int(w.rect.height * sy))
-            pygame.draw.rect(self.screen, (90, 100, 120), (rx, ry, rw, rh))
-
-        # Draw powerups
-        for pu in self.powerups:
-            rx = int(x0 + pu.rect.centerx * sx)
-            ry = int(y0 + pu.rect.centery * sy)
-            pygame.draw.circle(self.screen, (180, 220, 120), (rx, ry), 3)
-
-        # Tanks
-        def draw_tank_dot(tank: Tank, color: tuple[int, int, int]):
-            rx = int(x0 + tank.rect.centerx * sx)
-            ry = int(y0 + tank.rect.centery * sy)
-            pygame.draw.circle(self.screen, color, (rx, ry), 4)
-
-        if not self.tank1_destroyed:
-            draw_tank_dot(self.tank1, COLOR_TANK_1)
-        if not self.tank2_destroyed:
-            draw_tank_dot(self.tank2, COLOR_TANK_2)
-
-        # Bullets
-        for b in self.bullets:
-            rx = int(x0 + b.x * sx)
-            ry = int(y0 + b.y * sy)
-            pygame.draw.circle(self.screen, (220, 220, 230), (rx, ry), 2)
-
-        # Label
-        label = self.small_font.render("Minimap (M: music)", True, (180, 180, 190))
-        self.screen.blit(label, (x0 + 6, y0 - 18))
+        self.minimap.draw(self.screen, self)
 
     @staticmethod
     def emit_tread_and_dust(tank: Tank) -> None:
@@ -1191,34 +2492,7 @@ class Game:
         for _ in range(1):
             dx = random.uniform(-0.6, 0.6)
             dy = random.uniform(-0.6, 0.6)
-            game_ref.particles.append(Particle(tx, ty, dx, dy, life=random.randint(10, 18), color=(120, 120, 120)))
-
-    def _maybe_spawn_powerup(self) -> None:
-        if self.round_end_timer > 0:
-            return
-        if self.powerup_spawn_cooldown > 0:
-            self.powerup_spawn_cooldown -= 1
-            return
-        # Try to spawn not overlapping walls/spawns
-        margin = 40
-        w, h = 26, 26
-        for _ in range(30):
-            x = random.randint(margin, WINDOW_WIDTH - margin - w)
-            y = random.randint(margin, WINDOW_HEIGHT - margin - h)
-            rect = pygame.Rect(x, y, w, h)
-            if rect.colliderect(self.tank1.rect.inflate(80, 80)) or rect.colliderect(self.tank2.rect.inflate(80, 80)):
-                continue
-            blocked = False
-            for wall in self.walls:
-                if rect.colliderect(wall.rect.inflate(12, 12)):
-                    blocked = True
-                    break
-            if blocked:
-                continue
-            kind = random.choice(PowerUp.TYPES)
-            self.powerups.append(PowerUp(rect, kind))
-            self.powerup_spawn_cooldown = int(FPS * random.uniform(5, 10))
-            break
+            game_ref.particles.emit(tx, ty, dx, dy, life=random.randint(10, 18), color=(120, 120, 120))
 
 
 class PowerUp:
@@ -1228,6 +2502,7 @@ class PowerUp:
         self.rect = rect
         self.kind = kind
         self.life = int(FPS * 12)
+        self.id = 0
 
     def update(self) -> None:
         if self.life > 0:
@@ -1246,8 +2521,8 @@ class PowerUp:
 
     def apply(self, tank: Tank) -> None:
         # Attach simple timed buffs to tank
-        now = pygame.time.get_ticks()
-        duration = 5000
+        now = tank.clock()
+        duration = POWERUP_DURATION_MS.get(self.kind, 0)
         if self.kind == "shield":
             setattr(tank, "buff_shield_until", now + duration)
         elif self.kind == "rapid":
@@ -1257,7 +2532,47 @@ class PowerUp:
 
 
 def tank_has_buff(tank: Tank, name: str) -> bool:
-    return getattr(tank, name, 0) > pygame.time.get_ticks()
+    return getattr(tank, name, 0) > tank.clock()
+
+
+def buff_remaining(tank: Tank) -> list[int]:
+    # Milliseconds left on each PowerUp.TYPES buff, as snapshots carry them
+    now = tank.clock()
+    return [max(0, getattr(tank, f"buff_{kind}_until", 0) - now) for kind in PowerUp.TYPES]
+
+
+# Pre-rendered shockwave + core flash frames: (max_radius, life) -> frame per remaining life
+_EXPLOSION_FRAME_CACHE: dict[tuple[int, int], list[tuple[pygame.Surface, int] | None]] = {}
+
+
+def _render_explosion_frame(max_radius: int, life: int, max_life: int) -> tuple[pygame.Surface, int] | None:
+    t = 1 - (life / max_life) if max_life > 0 else 1
+    radius = int(max_radius * t)
+    alpha_outer = int(120 * (1 - t))
+    alpha_inner = int(200 * (1 - t))
+    if radius <= 0:
+        return None
+    # Shockwave ring
+    half = radius + 4
+    frame = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
+    pygame.draw.circle(frame, (255, 200, 120, alpha_outer), (half, half), radius)
+    pygame.draw.circle(frame, (0, 0, 0, 0), (half, half), max(radius - 6, 1))
+    # Core flash
+    core_r = max(1, radius // 4)
+    core_surface = pygame.Surface((core_r * 2 + 2, core_r * 2 + 2), pygame.SRCALPHA)
+    pygame.draw.circle(core_surface, (255, 240, 200, alpha_inner), (core_r + 1, core_r + 1), core_r)
+    frame.blit(core_surface, (half - core_r, half - core_r))
+    if pygame.display.get_surface() is not None:
+        frame = frame.convert_alpha()
+    return frame, half
+
+
+def get_explosion_frames(max_radius: int, life: int) -> list[tuple[pygame.Surface, int] | None]:
+    frames = _EXPLOSION_FRAME_CACHE.get((max_radius, life))
+    if frames is None:
+        frames = [_render_explosion_frame(max_radius, remaining, life) for remaining in range(life + 1)]
+        _EXPLOSION_FRAME_CACHE[(max_radius, life)] = frames
+    return frames
 
 
 class Explosion:
@@ -1267,91 +2582,672 @@ class Explosion:
         self.max_radius = max_radius
         self.life = life
         self.max_life = life
+        self.frames = get_explosion_frames(max_radius, life)
 
     def update(self) -> None:
         if self.life > 0:
             self.life -= 1
 
     def draw(self, surface: pygame.Surface, ox: int = 0, oy: int = 0) -> None:
-        t = 1 - (self.life / self.max_life) if self.max_life > 0 else 1
-        radius = int(self.max_radius * t)
-        alpha_outer = int(120 * (1 - t))
-        alpha_inner = int(200 * (1 - t))
-        if radius <= 0:
+        frame = self.frames[max(0, min(self.life, self.max_life))]
+        if frame is None:
+            return
+        sprite, half = frame
+        surface.blit(sprite, (int(self.x - half + ox), int(self.y - half + oy)))
+
+
+# Wire protocol. Binary datagrams start with MAGIC + version + message type and
+# carry quantized, struct-packed records; JSON datagrams (debug mode) start with '{'.
+# Decoding accepts both, and hosts answer each client in the format it uses.
+#
+# State messages are deltas: 'seq' numbers each snapshot sent to a client and 'base'
+# names the snapshot it is relative to (0 = empty, i.e. a full snapshot). Clients
+# echo the newest seq they reconstructed as 'ack' in every input message.
+# Inputs carry their client tick number 'n' and, in 'prev', the key bitmasks of ticks
+# n-1, n-2, ... so a lost packet's input arrives with the next one. 'map' is the
+# (seed, first wall ID) pair the receiver regenerates the untouched map from; each tank record in a state says which
+# 'n' the host last consumed for it, and 'you' tells the receiving client its tank.
+WIRE_BINARY = "binary"
+WIRE_JSON = "json"
+WIRE_MAGIC = b"T2"
+WIRE_VERSION = 6
+WIRE_MSG_INPUT = 1
+WIRE_MSG_STATE = 2
+WIRE_POS_SCALE = 4  # bullet positions are sent in quarter pixels
+WIRE_SNAPSHOT_BUDGET = 1200  # bytes per state datagram, below a typical 1500-byte MTU
+SNAPSHOT_HISTORY = 64  # snapshots kept per client as possible delta baselines
+# Snapshot rate control, per client: interval by scene, stretched on a bad link
+SNAPSHOT_COMBAT_MS = 33
+SNAPSHOT_IDLE_MS = 100
+SNAPSHOT_FROZEN_MS = 200
+SNAPSHOT_COMBAT_BULLETS = 3
+SNAPSHOT_LOSSY = 0.05
+SNAPSHOT_SLOW_RTT_MS = 150
+SNAPSHOT_BYTES_PER_S_MAX = 48000
+SNAPSHOT_BYTES_PER_S_MIN = 8000
+SNAPSHOT_MIN_BUDGET = 256  # bytes; tanks, removals and a few entities always fit
+
+_WIRE_HEADER = struct.Struct("!2sBB")
+_WIRE_INPUT = struct.Struct("!BIII")  # key bitmask, client time ms, acked snapshot seq, input seq
+_WIRE_STATE = struct.Struct("!IIIBBBHHII")  # seq, base seq, time ms, scores, your tank, countdown, round end timer, map seed, first wall ID
+_WIRE_TANK = struct.Struct("!HHBIHHH")  # x, y, alive, last consumed input seq, ms left on each buff
+_WIRE_NO_PLAYER = 255
+_WIRE_COUNTS = struct.Struct("!HHHHHH")  # bullets, new walls, wall hp changes, removed walls, new powerups, removed powerups
+_WIRE_BULLET = struct.Struct("!IHHB")  # id, x, y (quantized), dx | dy << 2 | color << 4
+_WIRE_WALL = struct.Struct("!IHHHHB")  # id, x, y, w, h, hp
+_WIRE_WALL_HP = struct.Struct("!IB")  # id, hp
+_WIRE_POWERUP = struct.Struct("!IHHBBB")  # id, x, y, w, h, kind index
+_WIRE_ID = struct.Struct("!I")
+_WIRE_STATE_FIXED = _WIRE_HEADER.size + _WIRE_STATE.size + 2 * _WIRE_TANK.size + _WIRE_COUNTS.size
+_INPUT_KEYS = ("up", "down", "left", "right", "fire")
+
+
+def _u16(v: float) -> int:
+    return max(0, min(0xFFFF, int(v)))
+
+
+def _pack_sid(msg: dict) -> bytes:
+    sid = str(msg.get('sid') or "").encode('utf-8')[:255]
+    return bytes([len(sid)]) + sid
+
+
+def input_mask(frame: dict) -> int:
+    mask = 0
+    for bit, key in enumerate(_INPUT_KEYS):
+        if frame.get(key):
+            mask |= 1 << bit
+    return mask
+
+
+def input_frames(msg: dict) -> list[dict]:
+    # All input frames carried by an input message, oldest first, each with its tick 'n'
+    n = int(msg.get('n', 0))
+    frames = [{key: bool(msg.get(key, False)) for key in _INPUT_KEYS}]
+    frames[0]['n'] = n
+    if n:
+        for back, mask in enumerate(msg.get('prev', ()), start=1):
+            if n - back <= 0:
+                break
+            frame = {key: bool(mask & (1 << bit)) for bit, key in enumerate(_INPUT_KEYS)}
+            frame['n'] = n - back
+            frames.append(frame)
+    frames.reverse()
+    return frames
+
+
+def encode_message(msg: dict, wire: str = WIRE_BINARY) -> bytes:
+    kind = msg.get('type')
+    if wire == WIRE_JSON or kind not in ('input', 'state'):
+        return json.dumps(msg).encode('utf-8')
+    if kind == 'input':
+        prev = bytes(msg.get('prev', ())[:255])
+        return (_WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, WIRE_MSG_INPUT)
+                + _WIRE_INPUT.pack(input_mask(msg), int(msg.get('time', 0)) & 0xFFFFFFFF, int(msg.get('ack', 0)) & 0xFFFFFFFF,
+                                   int(msg.get('n', 0)) & 0xFFFFFFFF)
+                + bytes([len(prev)]) + prev
+                + _pack_sid(msg))
+    scores = msg.get('scores', [0, 0])
+    you = msg.get('you')
+    parts = [
+        _WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, WIRE_MSG_STATE),
+        _WIRE_STATE.pack(msg.get('seq', 0), msg.get('base', 0), int(msg.get('t', 0)) & 0xFFFFFFFF,
+                         min(255, scores[0]), min(255, scores[1]), _WIRE_NO_PLAYER if you is None else you,
+                         _u16(msg.get('countdown', 0)), _u16(msg.get('round_end', 0)), *(msg.get('map') or (0, 0))),
+    ]
+    for tk in msg.get('tanks', []):
+        parts.append(_WIRE_TANK.pack(_u16(tk['x']), _u16(tk['y']), 1 if tk.get('alive', True) else 0, tk.get('n', 0) & 0xFFFFFFFF,
+                                     *(_u16(left) for left in tk.get('buffs', (0, 0, 0)))))
+    bullets = msg.get('bullets', [])
+    walls = msg.get('walls', [])
+    wall_hp = msg.get('wall_hp', [])
+    walls_gone = msg.get('walls_gone', [])
+    powerups = msg.get('powerups', [])
+    powerups_gone = msg.get('powerups_gone', [])
+    parts.append(_WIRE_COUNTS.pack(len(bullets), len(walls), len(wall_hp), len(walls_gone), len(powerups), len(powerups_gone)))
+    for b in bullets:
+        flags = (b.get('dx', 0) + 1) | (b.get('dy', 0) + 1) << 2 | (1 if b.get('c', 1) == 2 else 0) << 4
+        parts.append(_WIRE_BULLET.pack(b.get('id', 0), _u16(round(b['x'] * WIRE_POS_SCALE)), _u16(round(b['y'] * WIRE_POS_SCALE)), flags))
+    for (wid, x, y, w, h, hp) in walls:
+        parts.append(_WIRE_WALL.pack(wid, _u16(x), _u16(y), _u16(w), _u16(h), max(0, min(255, hp))))
+    for (wid, hp) in wall_hp:
+        parts.append(_WIRE_WALL_HP.pack(wid, max(0, min(255, hp))))
+    for wid in walls_gone:
+        parts.append(_WIRE_ID.pack(wid))
+    for (pid, x, y, w, h, kind_name) in powerups:
+        kind_idx = PowerUp.TYPES.index(kind_name) if kind_name in PowerUp.TYPES else 255
+        parts.append(_WIRE_POWERUP.pack(pid, _u16(x), _u16(y), min(255, w), min(255, h), kind_idx))
+    for pid in powerups_gone:
+        parts.append(_WIRE_ID.pack(pid))
+    return b"".join(parts)
+
+
+def decode_message(data: bytes) -> dict | None:
+    # Returns the same dict shape the JSON protocol uses, or None for garbage/unknown versions
+    try:
+        if data[:1] == b"{":
+            msg = json.loads(data.decode('utf-8'))
+            return msg if isinstance(msg, dict) else None
+        magic, version, kind = _WIRE_HEADER.unpack_from(data, 0)
+        if magic != WIRE_MAGIC or version != WIRE_VERSION:
+            return None
+        off = _WIRE_HEADER.size
+        if kind == WIRE_MSG_INPUT:
+            mask, t, ack, n = _WIRE_INPUT.unpack_from(data, off)
+            off += _WIRE_INPUT.size
+            msg = {'type': 'input', 'time': t, 'ack': ack, 'n': n}
+            for bit, key in enumerate(_INPUT_KEYS):
+                msg[key] = bool(mask & (1 << bit))
+            n = data[off]
+            msg['prev'] = list(data[off + 1:off + 1 + n])
+            off += 1 + n
+            n = data[off]
+            if n:
+                msg['sid'] = data[off + 1:off + 1 + n].decode('utf-8')
+            return msg
+        if kind != WIRE_MSG_STATE:
+            return None
+        seq, base, t, s1, s2, you, countdown, round_end, map_seed, map_first_id = _WIRE_STATE.unpack_from(data, off)
+        off += _WIRE_STATE.size
+        tanks = []
+        for _ in range(2):
+            x, y, alive, n, *buffs = _WIRE_TANK.unpack_from(data, off)
+            off += _WIRE_TANK.size
+            tanks.append({'x': x, 'y': y, 'alive': bool(alive), 'n': n, 'buffs': buffs})
+        nb, nw, nhp, nwg, npu, npg = _WIRE_COUNTS.unpack_from(data, off)
+        off += _WIRE_COUNTS.size
+
+        def records(fmt: struct.Struct, n: int) -> list[tuple]:
+            nonlocal off
+            chunk = data[off:off + n * fmt.size]
+            if len(chunk) != n * fmt.size:
+                raise ValueError("truncated state message")
+            off += n * fmt.size
+            return list(fmt.iter_unpack(chunk))
+
+        bullets = []
+        for bid, x, y, flags in records(_WIRE_BULLET, nb):
+            bullets.append({'id': bid, 'x': x / WIRE_POS_SCALE, 'y': y / WIRE_POS_SCALE, 'dx': (flags & 3) - 1, 'dy': (flags >> 2 & 3) - 1, 'c': 2 if flags & 16 else 1})
+        walls = [list(rec) for rec in records(_WIRE_WALL, nw)]
+        wall_hp = [list(rec) for rec in records(_WIRE_WALL_HP, nhp)]
+        walls_gone = [rec[0] for rec in records(_WIRE_ID, nwg)]
+        powerups = []
+        for pid, x, y, w, h, kind_idx in records(_WIRE_POWERUP, npu):
+            if kind_idx < len(PowerUp.TYPES):
+                powerups.append([pid, x, y, w, h, PowerUp.TYPES[kind_idx]])
+        powerups_gone = [rec[0] for rec in records(_WIRE_ID, npg)]
+        return {
+            'type': 'state', 'seq': seq, 'base': base, 't': t, 'scores': [s1, s2],
+            'you': None if you == _WIRE_NO_PLAYER else you, 'countdown': countdown, 'round_end': round_end,
+            'map': [map_seed, map_first_id] if map_first_id else None, 'tanks': tanks,
+            'bullets': bullets, 'walls': walls, 'wall_hp': wall_hp, 'walls_gone': walls_gone,
+            'powerups': powerups, 'powerups_gone': powerups_gone,
+        }
+    except (struct.error, IndexError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def datagram_wire(data: bytes) -> str:
+    return WIRE_JSON if data[:1] == b"{" else WIRE_BINARY
+
+
+# Snapshot baselines: a state as one client knows it, with walls and powerups keyed
+# by entity ID so deltas can be computed and applied by lookup
+# Fields sent whole in every delta
+_SNAPSHOT_FIELDS = {'t': 0, 'scores': [0, 0], 'you': None, 'countdown': 0, 'round_end': 0, 'map': None, 'tanks': []}
+_EMPTY_BASELINE = {**_SNAPSHOT_FIELDS, 'bullets': [], 'walls': {}, 'powerups': {}}
+
+
+def _map_walls(map_ref: list[int] | None) -> dict[int, list]:
+    # Wall records of an undamaged map, as both ends rebuild them from (seed, first ID)
+    if not map_ref:
+        return {}
+    seed, first_id = map_ref
+    return {first_id + i: [first_id + i, x, y, w, h, WALL_HP] for i, (x, y, w, h) in enumerate(generate_map(seed))}
+
+
+def _snapshot_from_baseline(baseline: dict, seq: int) -> dict:
+    return {
+        'type': 'state',
+        'seq': seq,
+        **{key: baseline[key] for key in _SNAPSHOT_FIELDS},
+        'bullets': baseline['bullets'],
+        'walls': list(baseline['walls'].values()),
+        'powerups': list(baseline['powerups'].values()),
+    }
+
+
+def diff_snapshot(
+    base: dict,
+    state: dict,
+    budget: int = WIRE_SNAPSHOT_BUDGET,
+    focus: tuple[float, float] | None = None,
+) -> tuple[dict, dict]:
+    # Delta from a client's baseline to the current full snapshot. Removals and wall hp
+    # changes are always sent; bullets, new powerups and new walls fill the remaining
+    # byte budget in that order, nearest to focus (the client's tank) first, and
+    # anything left over goes out in later deltas. A new map is sent as its seed: the
+    # client rebuilds the walls, so only later damage and destruction cost bytes.
+    # Returns (message without seq/base, baseline the client will hold after applying it)
+    if state.get('map') != base.get('map'):
+        walls = _map_walls(state.get('map'))
+    else:
+        walls = dict(base['walls'])
+    powerups = dict(base['powerups'])
+    cur_walls = {rec[0]: rec for rec in state['walls']}
+    cur_powerups = {rec[0]: rec for rec in state['powerups']}
+    walls_gone = [wid for wid in walls if wid not in cur_walls]
+    powerups_gone = [pid for pid in powerups if pid not in cur_powerups]
+    for wid in walls_gone:
+        del walls[wid]
+    for pid in powerups_gone:
+        del powerups[pid]
+    wall_hp = []
+    for wid, rec in walls.items():
+        hp = cur_walls[wid][5]
+        if rec[5] != hp:
+            wall_hp.append([wid, hp])
+            walls[wid] = cur_walls[wid]
+    room = (budget - _WIRE_STATE_FIXED - len(wall_hp) * _WIRE_WALL_HP.size
+            - (len(walls_gone) + len(powerups_gone)) * _WIRE_ID.size)
+
+    def take(records: list, size: int) -> list:
+        nonlocal room
+        n = max(0, min(len(records), room // size))
+        room -= n * size
+        return records[:n]
+
+    bullets = state['bullets']
+    new_powerups = [rec for pid, rec in cur_powerups.items() if pid not in powerups]
+    new_walls = [rec for wid, rec in cur_walls.items() if wid not in walls]
+    if focus is not None:
+        fx, fy = focus
+        bullets = sorted(bullets, key=lambda b: abs(b['x'] - fx) + abs(b['y'] - fy))
+        new_powerups.sort(key=lambda rec: abs(rec[1] + rec[3] / 2 - fx) + abs(rec[2] + rec[4] / 2 - fy))
+        new_walls.sort(key=lambda rec: abs(rec[1] + rec[3] / 2 - fx) + abs(rec[2] + rec[4] / 2 - fy))
+    bullets = take(bullets, _WIRE_BULLET.size)
+    new_powerups = take(new_powerups, _WIRE_POWERUP.size)
+    new_walls = take(new_walls, _WIRE_WALL.size)
+    for rec in new_walls:
+        walls[rec[0]] = rec
+    for rec in new_powerups:
+        powerups[rec[0]] = rec
+    fields = {key: state.get(key, default) for key, default in _SNAPSHOT_FIELDS.items()}
+    msg = {
+        'type': 'state', **fields,
+        'bullets': bullets, 'walls': new_walls, 'wall_hp': wall_hp, 'walls_gone': walls_gone,
+        'powerups': new_powerups, 'powerups_gone': powerups_gone,
+    }
+    return msg, {**fields, 'bullets': bullets, 'walls': walls, 'powerups': powerups}
+
+
+def apply_snapshot_delta(base: dict, msg: dict) -> dict:
+    if msg.get('map') != base.get('map'):
+        walls = _map_walls(msg.get('map'))
+    else:
+        walls = dict(base['walls'])
+    powerups = dict(base['powerups'])
+    for wid in msg.get('walls_gone', []):
+        walls.pop(wid, None)
+    for wid, hp in msg.get('wall_hp', []):
+        if wid in walls:
+            rec = list(walls[wid])
+            rec[5] = hp
+            walls[wid] = rec
+    for rec in msg.get('walls', []):
+        walls[rec[0]] = rec
+    for pid in msg.get('powerups_gone', []):
+        powerups.pop(pid, None)
+    for rec in msg.get('powerups', []):
+        powerups[rec[0]] = rec
+    return {
+        **{key: msg.get(key, default) for key, default in _SNAPSHOT_FIELDS.items()},
+        'bullets': msg.get('bullets', []), 'walls': walls, 'powerups': powerups,
+    }
+
+
+def snapshot_scene(state: dict, prev: dict | None) -> str:
+    # How busy the match is, for picking a snapshot rate: 'frozen' between rounds,
+    # 'combat' with several bullets flying, 'idle' when nothing moved since prev
+    if state.get('countdown') or state.get('round_end'):
+        return 'frozen'
+    if len(state['bullets']) >= SNAPSHOT_COMBAT_BULLETS:
+        return 'combat'
+    if not state['bullets'] and prev is not None and all(
+        (a['x'], a['y'], a['alive']) == (b['x'], b['y'], b['alive']) for a, b in zip(prev['tanks'], state['tanks'])
+    ):
+        return 'idle'
+    return 'active'
+
+
+class SnapshotStream:
+    # Host side of delta snapshots for one client: what we sent under each seq, the
+    # newest seq the client has acknowledged (its delta baseline), and a rate
+    # controller fed by round trip time and loss measured from those acks
+    def __init__(self, player: int | None = None) -> None:
+        # Tank index the client controls, reported to it as 'you'
+        self.player = player
+        self.seq = 0
+        self.acked = 0
+        self.sent: OrderedDict[int, dict] = OrderedDict()
+        self.sent_ms: dict[int, int] = {}
+        self.last_send_ms = -SNAPSHOT_FROZEN_MS
+        self.interval_ms = SERVER_BROADCAST_MS
+        # Link estimates: smoothed round trip (None until measured) and fraction of
+        # snapshots the client never acknowledged
+        self.rtt_ms: float | None = None
+        self.loss = 0.0
+        # Byte rate we allow ourselves toward this client (additive increase, multiplicative decrease)
+        self.bytes_per_s = float(SNAPSHOT_BYTES_PER_S_MAX)
+
+    def ack(self, seq: int | None, now: int) -> None:
+        if not seq:
+            # Client has nothing yet (or restarted on the same address): resend in full
+            self.acked = 0
+            return
+        if seq <= self.acked or seq not in self.sent:
             return
-        # Shockwave ring
-        ring_surface = pygame.Surface((radius * 2 + 8, radius * 2 + 8), pygame.SRCALPHA)
-        pygame.draw.circle(ring_surface, (255, 200, 120, alpha_outer), (radius + 4, radius + 4), radius)
-        pygame.draw.circle(ring_surface, (0, 0, 0, 0), (radius + 4, radius + 4), max(radius - 6, 1))
-        surface.blit(ring_surface, (int(self.x - radius - 4 + ox), int(self.y - radius - 4 + oy)))
-        # Core flash
-        core_r = max(1, radius // 4)
-        core_surface = pygame.Surface((core_r * 2 + 2, core_r * 2 + 2), pygame.SRCALPHA)
-        pygame.draw.circle(core_surface, (255, 240, 200, alpha_inner), (core_r + 1, core_r + 1), core_r)
-        surface.blit(core_surface, (int(self.x - core_r + ox), int(self.y - core_r + oy)))
+        skipped = seq - self.acked - 1 if self.acked else 0
+        self.loss += 0.1 * (skipped / (skipped + 1) - self.loss)
+        sample = now - self.sent_ms.get(seq, now)
+        self.rtt_ms = sample if self.rtt_ms is None else self.rtt_ms + 0.125 * (sample - self.rtt_ms)
+        if skipped:
+            self.bytes_per_s = max(SNAPSHOT_BYTES_PER_S_MIN, self.bytes_per_s * 0.75)
+        else:
+            self.bytes_per_s = min(SNAPSHOT_BYTES_PER_S_MAX, self.bytes_per_s + 256)
+        self.acked = seq
+        # Older baselines can no longer be asked for
+        while self.sent and next(iter(self.sent)) < seq:
+            old, _ = self.sent.popitem(last=False)
+            self.sent_ms.pop(old, None)
+
+    def due(self, state: dict, now: int) -> bool:
+        # Pick the interval for this scene and link, then say whether a snapshot is owed
+        scene = snapshot_scene(state, self.sent.get(self.seq))
+        interval = {
+            'combat': SNAPSHOT_COMBAT_MS,
+            'active': SERVER_BROADCAST_MS,
+            'idle': SNAPSHOT_IDLE_MS,
+            'frozen': SNAPSHOT_FROZEN_MS,
+        }[scene]
+        if self.loss > SNAPSHOT_LOSSY or (self.rtt_ms or 0) > SNAPSHOT_SLOW_RTT_MS:
+            # Congested link (e.g. Wi-Fi): fewer packets rather than more losses
+            interval = interval * 3 // 2
+        self.interval_ms = interval
+        return now - self.last_send_ms >= interval
+
+    def encode(self, state: dict, wire: str, now: int) -> bytes:
+        base = self.sent.get(self.acked, _EMPTY_BASELINE) if self.acked else _EMPTY_BASELINE
+        budget = min(WIRE_SNAPSHOT_BUDGET, max(SNAPSHOT_MIN_BUDGET, int(self.bytes_per_s * self.interval_ms / 1000)))
+        focus = None
+        if self.player is not None and self.player < len(state['tanks']):
+            tk = state['tanks'][self.player]
+            focus = (tk['x'] + TANK_SIZE[0] / 2, tk['y'] + TANK_SIZE[1] / 2)
+        msg, baseline = diff_snapshot(base, {**state, 'you': self.player}, budget, focus)
+        self.seq += 1
+        msg['seq'] = self.seq
+        msg['base'] = self.acked if base is not _EMPTY_BASELINE else 0
+        self.sent[self.seq] = baseline
+        self.sent_ms[self.seq] = now
+        self.last_send_ms = now
+        while len(self.sent) > SNAPSHOT_HISTORY:
+            old, _ = self.sent.popitem(last=False)
+            self.sent_ms.pop(old, None)
+        return encode_message(msg, wire)
+
+
+class SnapshotReceiver:
+    # Client side: rebuilds full snapshots from deltas and tracks what to acknowledge
+    def __init__(self) -> None:
+        self.acked = 0
+        self.states: OrderedDict[int, dict] = OrderedDict()
+
+    def receive(self, msg: dict) -> dict | None:
+        # Returns the rebuilt snapshot if it is newer than anything seen so far
+        seq = msg.get('seq', 0)
+        base_seq = msg.get('base', 0)
+        base = self.states.get(base_seq) if base_seq else _EMPTY_BASELINE
+        if not base_seq and seq + SNAPSHOT_HISTORY < self.acked:
+            # Full snapshot far behind what we acked: the host restarted its numbering
+            self.acked = 0
+            self.states.clear()
+        if base is None or seq in self.states:
+            return None
+        baseline = apply_snapshot_delta(base, msg)
+        self.states[seq] = baseline
+        while len(self.states) > SNAPSHOT_HISTORY:
+            self.states.popitem(last=False)
+        if seq <= self.acked:
+            return None
+        self.acked = seq
+        return _snapshot_from_baseline(baseline, seq)
+
+
+NET_SELECT_TIMEOUT_S = 0.25
+NET_INPUT_QUEUE_LIMIT = 256  # per client; a stalled host drops the oldest inputs first
+NET_CLIENT_TIMEOUT_MS = 2000  # a full host gives a silent client's slot to a new address after this
+
+
+class ClientTable:
+    # Host-side seats of one match: which client address controls which player, when it
+    # was last heard from, the format it speaks, its snapshot stream and its queued inputs.
+    # Not thread-safe; NetManager wraps it in its lock, match workers are single-threaded
+    def __init__(self, max_clients: int, first_player: int = 0) -> None:
+        self.max_clients = max_clients
+        # Tank index of seat 0 (1 on a listen host, whose own player is tank 0)
+        self.first_player = first_player
+        # Client addresses in join order; seat i controls player i + first_player
+        self.addrs: list[tuple[str, int]] = []
+        # Arrival time of the last datagram from each seat's client
+        self.seen: list[int] = []
+        self.wires: dict[tuple[str, int], str] = {}
+        self.streams: dict[tuple[str, int], SnapshotStream] = {}
+        # Every input since the last drain, per seat, in arrival order
+        self.inputs: list[deque[dict]] = []
+        self.last_seen = _now_ms()
+
+    def __len__(self) -> int:
+        return len(self.addrs)
+
+    def receive(self, addr: tuple[str, int], msg: dict, wire: str, rx_ms: int) -> int | None:
+        # Seat an input datagram and queue it; None when every seat is taken by a live client
+        slot = self._claim(addr, rx_ms)
+        if slot is None:
+            return None
+        self.seen[slot] = rx_ms
+        self.last_seen = max(self.last_seen, rx_ms)
+        # Local only: lets the seat's RemoteInput notice a new client
+        msg['src'] = addr
+        self.wires[addr] = wire
+        self._stream(slot).ack(msg.get('ack'), rx_ms)
+        self.inputs[slot].append(msg)
+        return slot
+
+    def _claim(self, addr: tuple[str, int], now: int) -> int | None:
+        # Seat of a known client, a free seat, or the seat of a client that went silent
+        # (e.g. restarted on a new port)
+        addrs = self.addrs
+        if addr in addrs:
+            return addrs.index(addr)
+        if len(addrs) < self.max_clients:
+            addrs.append(addr)
+            self.seen.append(now)
+            self.inputs.append(deque(maxlen=NET_INPUT_QUEUE_LIMIT))
+            return len(addrs) - 1
+        if self.max_clients == 1:
+            # Single-client host: the latest sender takes over right away
+            slot = 0
+        else:
+            slot = min(range(len(addrs)), key=self.seen.__getitem__)
+            if now - self.seen[slot] < NET_CLIENT_TIMEOUT_MS:
+                return None
+        old = addrs[slot]
+        self.streams.pop(old, None)
+        self.wires.pop(old, None)
+        self.inputs[slot].clear()
+        addrs[slot] = addr
+        return slot
+
+    def _stream(self, slot: int) -> SnapshotStream:
+        addr = self.addrs[slot]
+        stream = self.streams.get(addr)
+        if stream is None:
+            stream = self.streams[addr] = SnapshotStream(player=slot + self.first_player)
+        return stream
+
+    def drain(self, slot: int) -> list[dict]:
+        # Inputs received from a seat since the last call, in arrival order
+        if slot >= len(self.inputs):
+            return []
+        queue = self.inputs[slot]
+        msgs = list(queue)
+        queue.clear()
+        return msgs
+
+    def idle_ms(self, now: int) -> int:
+        return now - self.last_seen
+
+    def snapshot_due(self, now: int) -> bool:
+        # Cheap check before building a snapshot: could any client want one yet?
+        return any(now - self._stream(slot).last_send_ms >= SNAPSHOT_COMBAT_MS for slot in range(len(self.addrs)))
+
+    def packets(self, state: dict, now: int, force: bool, default_wire: str) -> list[tuple[tuple[str, int], bytes]]:
+        # Each client whose rate controller says it is due (or everyone, with force)
+        # gets a delta against the last snapshot it acknowledged
+        out = []
+        for slot, addr in enumerate(self.addrs):
+            stream = self._stream(slot)
+            if force or stream.due(state, now):
+                out.append((addr, stream.encode(state, self.wires.get(addr, default_wire), now)))
+        return out
+
+    def link_stats(self) -> list[dict]:
+        # Per-client link estimates and current snapshot rate, in seat order
+        streams = [self._stream(slot) for slot in range(len(self.addrs))]
+        return [
+            {'rtt_ms': st.rtt_ms, 'loss': st.loss, 'interval_ms': st.interval_ms, 'bytes_per_s': st.bytes_per_s}
+            for st in streams
+        ]
 
 
 class NetManager:
-    def __init__(self, role: str, port: int, host_ip: str | None = None) -> None:
+    def __init__(
+        self,
+        role: str,
+        port: int,
+        host_ip: str | None = None,
+        max_clients: int = 1,
+        session: str = "",
+        wire: str = WIRE_BINARY,
+        first_player: int = 1,
+    ) -> None:
         self.role = role
+        # Format we send in; hosts reply to each client in the format that client uses
+        self.wire = wire
         self.port = port
         self.host_ip = host_ip
+        # Client: match to join on a multi-match server (ignored by single-match hosts)
+        self.session = session
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.setblocking(False)
         if role == 'host':
             self.sock.bind(('0.0.0.0', port))
         self.running = True
         self._latest_state: dict | None = None
-        self._client_addr: tuple[str, int] | None = None
+        # Host: client seats; slot i controls player i + first_player
+        self._clients = ClientTable(max_clients, first_player)
+        self._snapshots = SnapshotReceiver()
+        # Client: every rebuilt snapshot since the last drain
+        self._states: deque[dict] = deque(maxlen=SNAPSHOT_BUFFER_SIZE)
         self._lock = threading.Lock()
         self._thread = threading.Thread(target=self._rx_loop, daemon=True)
         self._thread.start()
 
     def _rx_loop(self) -> None:
-        while self.running:
-            try:
-                data, addr = self.sock.recvfrom(65535)
-            except (BlockingIOError, OSError):
-                time.sleep(0.005)
-                continue
-            except Exception:
-                break
-            try:
-                msg = json.loads(data.decode('utf-8'))
-            except Exception:
-                continue
-            if self.role == 'host':
-                # Record client and update last input
-                if msg.get('type') == 'input':
-                    with self._lock:
-                        self._client_addr = addr
-                        self._latest_input = msg
-            else:
-                if msg.get('type') == 'state':
-                    with self._lock:
-                        self._latest_state = msg
+        # Sleep in select() until a datagram arrives, then drain everything queued.
+        # The timeout only bounds how long close() waits for the thread to notice
+        sel = selectors.DefaultSelector()
+        sel.register(self.sock, selectors.EVENT_READ)
+        try:
+            while self.running:
+                try:
+                    if not sel.select(timeout=NET_SELECT_TIMEOUT_S):
+                        continue
+                except OSError:
+                    # E.g. Windows refuses select() on a client socket that hasn't sent yet
+                    time.sleep(NET_SELECT_TIMEOUT_S)
+                    continue
+                while self.running:
+                    try:
+                        data, addr = self.sock.recvfrom(65535)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        # ICMP port unreachable etc. surfaces here on some platforms
+                        break
+                    self._on_datagram(data, addr, _now_ms())
+        finally:
+            sel.close()
+
+    def _on_datagram(self, data: bytes, addr: tuple[str, int], rx_ms: int) -> None:
+        msg = decode_message(data)
+        if msg is None:
+            return
+        # Local arrival time (monotonic ms); never sent on the wire
+        msg['rx_ms'] = rx_ms
+        if self.role == 'host':
+            # Record client and queue its input
+            if msg.get('type') != 'input':
+                return
+            with self._lock:
+                self._clients.receive(addr, msg, datagram_wire(data), rx_ms)
+        elif msg.get('type') == 'state':
+            # Rebuilding can generate a whole new map, so it runs before taking the lock the
+            # render thread waits on; only this thread touches the receiver
+            state = self._snapshots.receive(msg)
+            if state is None:
+                return
+            state['rx_ms'] = rx_ms
+            with self._lock:
+                self._latest_state = state
+                self._states.append(state)
 
     def send_input(self, payload: dict) -> None:
         if self.role != 'client':
             return
         if not self.host_ip:
             return
+        payload = {**payload, 'ack': self._snapshots.acked}
+        if self.session:
+            payload['sid'] = self.session
         try:
-            self.sock.sendto(json.dumps(payload).encode('utf-8'), (self.host_ip, self.port))
+            self.sock.sendto(encode_message(payload, self.wire), (self.host_ip, self.port))
         except Exception:
             pass
 
-    def broadcast_state(self, state: dict) -> None:
+    def snapshot_due(self) -> bool:
+        # Cheap check before building a snapshot: could any client want one yet?
         if self.role != 'host':
-            return
+            return False
         with self._lock:
-            addr = self._client_addr
-        if not addr:
+            return self._clients.snapshot_due(_now_ms())
+
+    def broadcast_state(self, state: dict, force: bool = False) -> None:
+        # Each client whose rate controller says it is due (or everyone, with force)
+        # gets a delta against the last snapshot it acknowledged
+        if self.role != 'host':
             return
-        try:
-            self.sock.sendto(json.dumps(state).encode('utf-8'), addr)
-        except Exception:
-            pass
+        with self._lock:
+            packets = self._clients.packets(state, _now_ms(), force, self.wire)
+        for addr, data in packets:
+            try:
+                self.sock.sendto(data, addr)
+            except Exception:
+                pass
+
+    def link_stats(self) -> list[dict]:
+        # Per-client link estimates and current snapshot rate, in slot order
+        with self._lock:
+            return self._clients.link_stats()
 
     def get_latest_state(self) -> dict | None:
         if self.role != 'client':
@@ -1359,11 +3255,343 @@ class NetManager:
         with self._lock:
             return self._latest_state
 
-    def get_latest_input(self) -> dict | None:
-        if self.role != 'host':
-            return None
+    def drain_states(self) -> list[dict]:
+        # New snapshots since the last call, oldest first, each with its arrival time 'rx_ms'
+        with self._lock:
+            states = list(self._states)
+            self._states.clear()
+        return states
+
+    def drain_inputs(self, slot: int = 0) -> list[dict]:
+        # Inputs received from a slot since the last call, in arrival order
         with self._lock:
-            return getattr(self, '_latest_input', None)
+            return self._clients.drain(slot)
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+
+SERVER_BROADCAST_MS = 50  # 20 Hz
+MATCH_RESTART_TICKS = TICK_RATE * 5
+MATCH_IDLE_TIMEOUT_MS = 30000
+DEFAULT_SESSION = "default"
+
+
+class Match:
+    # One headless two-player match: simulation plus per-slot remote input
+    def __init__(self, seed: int | None = None) -> None:
+        self.sim = Simulation(seed=seed)
+        self.remotes = [RemoteInput(), RemoteInput()]
+        self._match_over_ticks = 0
+
+    def tick(self, msgs: list[list[dict]], now: int, players: int) -> bool:
+        # Returns True when a round was reset or started this tick (clients want a fresh state right away)
+        for remote, msg in zip(self.remotes, msgs):
+            remote.poll(msg, now)
+        # Wait for both players before the first round starts
+        if players < 2:
+            self.sim.countdown_frames = int(2 * FPS)
+        events = self.sim.step((self.remotes[0].to_tank_input(), self.remotes[1].to_tank_input()))
+        reset = any(ev[0] in ("round_reset", "round_start") for ev in events)
+        # Match over: let clients show the win screen, then start a new match
+        if max(self.sim.tank1.score, self.sim.tank2.score) >= WIN_SCORE:
+            self._match_over_ticks += 1
+            if self._match_over_ticks >= MATCH_RESTART_TICKS:
+                self._match_over_ticks = 0
+                self.sim.tank1.score = 0
+                self.sim.tank2.score = 0
+                self.sim.reset_round(generate_new_map=True)
+                reset = True
+        return reset
+
+    def snapshot(self, now: int) -> dict:
+        return build_state_snapshot(self.sim, now)
+
+
+def _now_ms() -> int:
+    return int(time.monotonic() * 1000)
+
+
+def _run_fixed_ticks(tick, should_run=lambda: True) -> None:
+    # Call tick() at TICK_RATE in real time; if we fall behind, skip ahead instead of bursting
+    tick_s = 1.0 / TICK_RATE
+    next_tick = time.monotonic()
+    while should_run():
+        tick()
+        next_tick += tick_s
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.monotonic()
+
+
+class DedicatedServer:
+    # Headless host: simulation + networking only, both players are remote clients
+    def __init__(self, port: int, seed: int | None = None) -> None:
+        self.match = Match(seed=seed)
+        self.sim = self.match.sim
+        self.net = NetManager(role='host', port=port, max_clients=2, first_player=0)
+
+    def tick(self) -> None:
+        now = _now_ms()
+        msgs = [self.net.drain_inputs(slot) for slot in range(2)]
+        reset = self.match.tick(msgs, now, self.net.client_count())
+        if reset or self.net.snapshot_due():
+            self.net.broadcast_state(self.match.snapshot(now), force=reset)
+
+    def serve_forever(self) -> None:
+        _run_fixed_ticks(self.tick, lambda: self.net.running)
+
+
+class _MatchSlot:
+    # Worker-side state for one session: the match and its client seats
+    def __init__(self) -> None:
+        self.match = Match()
+        self.clients = ClientTable(max_clients=2)
+
+
+def _match_worker(inbox, worker_id: int, parent_pid: int) -> None:
+    # Worker process: owns the matches whose session hashes to it and replies to
+    # clients from its own socket (clients accept state from any source port)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sessions: dict[str, _MatchSlot] = {}
+
+    def send(slot: _MatchSlot, now: int, force: bool) -> None:
+        if not (force or slot.clients.snapshot_due(now)):
+            return
+        for addr, data in slot.clients.packets(slot.match.snapshot(now), now, force, WIRE_BINARY):
+            try:
+                sock.sendto(data, addr)
+            except Exception:
+                pass
+
+    def tick() -> None:
+        now = _now_ms()
+        # Drain datagrams routed to us since the last tick
+        while True:
+            try:
+                sid, addr, msg, wire = inbox.get_nowait()
+            except Exception:
+                break
+            slot = sessions.get(sid)
+            if slot is None:
+                slot = sessions[sid] = _MatchSlot()
+            slot.clients.receive(addr, msg, wire, msg.get('rx_ms', now))
+        for sid in list(sessions):
+            slot = sessions[sid]
+            if slot.clients.idle_ms(now) > MATCH_IDLE_TIMEOUT_MS:
+                del sessions[sid]
+                continue
+            msgs = [slot.clients.drain(idx) for idx in range(2)]
+            reset = slot.match.tick(msgs, now, len(slot.clients))
+            send(slot, now, reset)
+
+    try:
+        # Exit with the router even if it was killed without cleanup
+        _run_fixed_ticks(tick, lambda: os.getppid() == parent_pid)
+    except KeyboardInterrupt:
+        pass
+
+
+class MatchServer:
+    # Many concurrent matches behind one UDP port. The router process reads every
+    # datagram and forwards it by session ID to one of a pool of worker processes;
+    # a session always lands on the same worker (stable hash of its ID)
+    def __init__(self, port: int, workers: int) -> None:
+        import multiprocessing
+        self.port = port
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('0.0.0.0', port))
+        self.inboxes = [multiprocessing.Queue() for _ in range(workers)]
+        self.workers = [
+            multiprocessing.Process(target=_match_worker, args=(inbox, i, os.getpid()), daemon=True)
+            for i, inbox in enumerate(self.inboxes)
+        ]
+
+    def worker_for(self, sid: str) -> int:
+        return zlib.crc32(sid.encode('utf-8')) % len(self.inboxes)
+
+    def serve_forever(self) -> None:
+        for proc in self.workers:
+            proc.start()
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except OSError:
+                break
+            msg = decode_message(data)
+            if msg is None or msg.get('type') != 'input':
+                continue
+            sid = str(msg.get('sid') or DEFAULT_SESSION)
+            # Monotonic time is system-wide, so workers can measure round trips from this
+            msg['rx_ms'] = _now_ms()
+            self.inboxes[self.worker_for(sid)].put((sid, addr, msg, datagram_wire(data)))
+
+
+def run_server(port: int, workers: int = 0) -> None:
+    # No window and no audio device: simulation and networking only
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if workers > 0:
+        server = MatchServer(port, workers)
+        print(f"Tanki 2D match server listening on UDP {port} ({workers} workers, {TICK_RATE} ticks/s)")
+    else:
+        server = DedicatedServer(port)
+        print(f"Tanki 2D server listening on UDP {port} ({TICK_RATE} ticks/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+BOTSIM_ROUND_LIMIT_TICKS = TICK_RATE * 60  # a round nobody wins by then counts as a draw
+BOTSIM_COLUMNS = (
+    "match_seed", "round", "map_seed", "winner", "ticks", "shots_0", "shots_1",
+    *(f"{kind}_{p}" for kind in PowerUp.TYPES for p in (0, 1)),
+)
+
+
+# Constants --set may override: only ones the simulation reads each time it uses them.
+# Anything captured at import time (a default argument, a value derived from FPS)
+# would keep its old value while the run reported it as applied
+BALANCE_CONSTANTS = (
+    "TANK_SPEED", "BULLET_SPEED", "BULLET_RADIUS", "BULLET_COOLDOWN_FRAMES", "BULLET_MAX_ALIVE_FRAMES",
+    "WALL_HP", "POWERUP_DURATION_MS", "BOTSIM_ROUND_LIMIT_TICKS",
+)
+
+
+def parse_override(item: str) -> tuple[str, str, int | float]:
+    # argparse type for --set: "NAME=VALUE" replaces a numeric constant, "NAME.key=VALUE"
+    # one entry of a table such as POWERUP_DURATION_MS; values take the type of what they replace
+    target, sep, raw = item.partition("=")
+    name, _, key = target.strip().partition(".")
+    if not sep or name not in BALANCE_CONSTANTS:
+        raise argparse.ArgumentTypeError(f"{item!r}: not one of {', '.join(BALANCE_CONSTANTS)}")
+    current = globals()[name]
+    if isinstance(current, dict):
+        if key not in current:
+            raise argparse.ArgumentTypeError(f"{item!r}: {name} entries are {', '.join(current)}")
+        current = current[key]
+    elif key:
+        raise argparse.ArgumentTypeError(f"{item!r}: {name} has no entries")
+    try:
+        return name, key, type(current)(raw.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{item!r}: {name} needs a {type(current).__name__}")
+
+
+def collect_overrides(items: list[tuple[str, str, int | float]]) -> dict[str, object]:
+    overrides: dict[str, object] = {}
+    for name, key, value in items:
+        if key:
+            overrides[name] = {**overrides.get(name, globals()[name]), key: value}
+        else:
+            overrides[name] = value
+    return overrides
+
+
+def _apply_overrides(overrides: dict[str, object]) -> None:
+    # Pool initializer: every worker process plays with the same constants
+    globals().update(overrides)
+
+
+def run_bot_match(job: tuple[int, int]) -> list[dict]:
+    # One headless bot-vs-bot match, stepped as fast as the CPU allows. The match seed
+    # fixes every map, powerup and bot decision, so any row can be replayed exactly
+    seed, rounds = job
+    sim = Simulation(seed)
+    bots = (Bot(0, seed * 2), Bot(1, seed * 2 + 1))
+    rows: list[dict] = []
+    row: dict | None = None
+    while len(rows) < rounds:
+        if row is None:
+            row = dict.fromkeys(BOTSIM_COLUMNS, 0)
+            row.update(match_seed=seed, round=len(rows) + 1, map_seed=sim.map_seed, winner=-1)
+        # Duration counts live play only, not the countdown or the end animation
+        if not sim.countdown_frames and not sim.round_end_timer:
+            row["ticks"] += 1
+        for ev in sim.step((bots[0].think(sim), bots[1].think(sim))):
+            if ev[0] == "shot":
+                row[f"shots_{0 if ev[1] is sim.tank1 else 1}"] += 1
+            elif ev[0] == "powerup":
+                row[f"{ev[2]}_{0 if ev[1] is sim.tank1 else 1}"] += 1
+            elif ev[0] == "tank_destroyed":
+                # Both tanks destroyed in the same tick is a draw
+                row["winner"] = -1 if sim.tank1_destroyed and sim.tank2_destroyed else int(sim.tank1_destroyed)
+            elif ev[0] == "round_reset":
+                rows.append(row)
+                row = None
+        if row is not None and row["ticks"] >= BOTSIM_ROUND_LIMIT_TICKS and not sim.round_end_timer:
+            sim.reset_round(generate_new_map=True)
+            rows.append(row)
+            row = None
+    return rows
+
+
+def _pyarrow():
+    # Optional dependency, only needed for Parquet output
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow; install it or write a .csv file instead")
+    return pyarrow
+
+
+def write_rows(path: str, rows: list[dict]) -> None:
+    if path.endswith(".parquet"):
+        pyarrow = _pyarrow()
+        table = pyarrow.table({name: [row[name] for row in rows] for name in BOTSIM_COLUMNS})
+        pyarrow.parquet.write_table(table, path)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=BOTSIM_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize_rows(rows: list[dict]) -> list[str]:
+    n = len(rows) or 1
+    wins = [sum(1 for row in rows if row["winner"] == p) for p in (-1, 0, 1)]
+    lines = [
+        f"rounds: {len(rows)}  P1 wins {wins[1] / n:.1%}  P2 wins {wins[2] / n:.1%}  draws {wins[0] / n:.1%}",
+        f"mean round: {sum(row['ticks'] for row in rows) / n / TICK_RATE:.1f} s of play",
+    ]
+    for kind in PowerUp.TYPES:
+        # Rounds where only one tank picked this kind up: how often did that tank win?
+        picked = [(row, 0 if row[f"{kind}_0"] else 1) for row in rows if bool(row[f"{kind}_0"]) != bool(row[f"{kind}_1"])]
+        won = sum(1 for row, p in picked if row["winner"] == p)
+        rate = f"{won / len(picked):.1%}" if picked else "n/a"
+        lines.append(f"{kind}: picked by one tank in {len(picked)} rounds, that tank won {rate}")
+    return lines
+
+
+def run_simulation(matches: int, rounds: int, seed: int, workers: int, out: str, overrides: dict[str, object]) -> None:
+    # Thousands of bot rounds for balance testing; matches are independent, so they
+    # spread over one worker process per core
+    import multiprocessing
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if out.endswith(".parquet"):
+        _pyarrow()  # fail before the run, not after it
+    workers = workers or os.cpu_count() or 1
+    jobs = [(seed + i, rounds) for i in range(matches)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_apply_overrides, initargs=(overrides,)) as pool:
+        # One match per task keeps every core busy until the last one finishes;
+        # imap returns them in job order, so the output only depends on the seed
+        rows = [row for match in pool.imap(run_bot_match, jobs) for row in match]
+    elapsed = time.perf_counter() - started
+    write_rows(out, rows)
+    for name, value in overrides.items():
+        print(f"{name} = {value}")
+    for line in summarize_rows(rows):
+        print(line)
+    print(f"{matches} matches on {workers} workers in {elapsed:.1f} s, written to {out}")
 
 
 def main() -> None:
@@ -1373,8 +3601,27 @@ def main() -> None:
     parser.add_argument("--port", type=int, default=50555, help="UDP port")
     parser.add_argument("--menu", action="store_true", help="Force show main menu on start")
     parser.add_argument("--safe", action="store_true", help="Safe mode: disable audio/network features")
+    parser.add_argument("--bot", action="store_true", help="Play locally against a computer-controlled tank")
+    parser.add_argument("--server", action="store_true", help="Run a headless dedicated server for two remote clients")
+    parser.add_argument("--workers", type=int, default=0, help="With --server: host many matches on this many worker processes; with --simulate: processes to use (default: all cores)")
+    parser.add_argument("--session", type=str, default="", help="Match ID to join on a multi-match server")
+    parser.add_argument("--interp-delay", type=int, default=INTERP_DELAY_MS, help="Client: draw remote tanks and bullets this many ms behind the host")
+    parser.add_argument("--simulate", type=int, default=0, metavar="MATCHES", help="Headless: play this many bot-vs-bot matches and write per-round statistics")
+    parser.add_argument("--rounds", type=int, default=20, help="With --simulate: rounds per match")
+    parser.add_argument("--seed", type=int, default=1, help="With --simulate: seed of the first match; match i uses seed + i")
+    parser.add_argument("--out", type=str, default="botsim.csv", help="With --simulate: output file, .csv or .parquet")
+    parser.add_argument("--set", action="append", default=[], type=parse_override, metavar="NAME=VALUE", help="With --simulate: override a balance constant, e.g. TANK_SPEED=3.5 or POWERUP_DURATION_MS.speed=8000")
+    parser.add_argument("--json-wire", action="store_true", help="Debug: send readable JSON datagrams instead of the binary protocol")
     args = parser.parse_args()
 
+    wire = WIRE_JSON if args.json_wire else WIRE_BINARY
+    if args.simulate:
+        run_simulation(args.simulate, args.rounds, args.seed, args.workers, args.out, collect_overrides(args.set))
+        return
+    if args.server:
+        run_server(args.port, args.workers)
+        return
+
     # Global crash protection: log unhandled exceptions
     def excepthook(exctype, value, tb):
         try:
@@ -1402,17 +3649,21 @@ def main() -> None:
 
     sys.excepthook = excepthook
 
+    if args.bot:
+        Game(bot=True).run()
+        return
+
     # If explicit role via CLI — skip menu
     if args.host or args.join:
         net_role = None
         net = None
         if args.host:
             net_role = 'host'
-            net = None if args.safe else NetManager(role='host', port=args.port)
+            net = None if args.safe else NetManager(role='host', port=args.port, wire=wire)
         elif args.join:
             net_role = 'client'
-            net = None if args.safe else NetManager(role='client', port=args.port, host_ip=args.join)
-        Game(net_role=net_role, net=net).run()
+            net = None if args.safe else NetManager(role='client', port=args.port, host_ip=args.join, session=args.session, wire=wire)
+        Game(net_role=net_role, net=net, interp_delay_ms=args.interp_delay).run()
         return
 
     # Otherwise show main menu
@@ -1420,11 +3671,12 @@ def main() -> None:
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("Tanki 2D – Menu")
     clock = pygame.time.Clock()
-    font = pygame.font.SysFont("consolas", 32, bold=True)
-    sfont = pygame.font.SysFont("consolas", 20)
+    font = get_font(32, bold=True)
+    sfont = get_font(20)
 
     menu_items = [
         ("Local: Two players on one PC", "local"),
+        ("Solo: Play against a bot", "bot"),
         ("Host: Create LAN game", "host"),
         ("Join: Connect to LAN host", "join"),
         ("Quit", "quit"),
@@ -1446,8 +3698,8 @@ def main() -> None:
                         input_ip = ""
                     elif event.key == pygame.K_RETURN:
                         # Start client with given IP
-                        net = None if args.safe else NetManager(role='client', port=port, host_ip=input_ip or '127.0.0.1')
-                        Game(net_role='client', net=net).run()
+                        net = None if args.safe else NetManager(role='client', port=port, host_ip=input_ip or '127.0.0.1', session=args.session, wire=wire)
+                        Game(net_role='client', net=net, interp_delay_ms=args.interp_delay).run()
                         return
                     elif event.key == pygame.K_BACKSPACE:
                         input_ip = input_ip[:-1]
@@ -1465,8 +3717,11 @@ def main() -> None:
                         if action == 'local':
                             Game().run()
                             return
+                        if action == 'bot':
+                            Game(bot=True).run()
+                            return
                         if action == 'host':
-                            net = None if args.safe else NetManager(role='host', port=port)
+                            net = None if args.safe else NetManager(role='host', port=port, wire=wire)
                             Game(net_role='host', net=net).run()
                             return
                         if action == 'join':
@@ -1477,26 +3732,26 @@ def main() -> None:
 
         # Draw menu
         screen.fill((15, 17, 20))
-        title = font.render("Tanki 2D", True, (230, 230, 240))
+        title = render_text(font, "Tanki 2D", (230, 230, 240))
         screen.blit(title, (WINDOW_WIDTH // 2 - title.get_width() // 2, 80))
 
         for idx, (label, _) in enumerate(menu_items):
             color = (240, 220, 120) if idx == selected and not entering_ip else (200, 205, 215)
-            item = sfont.render(label, True, color)
+            item = render_text(sfont, label, color)
             screen.blit(item, (WINDOW_WIDTH // 2 - 220, 200 + idx * 40))
 
-        tip = sfont.render("Arrows: navigate, Enter: select, Esc: quit", True, (150, 155, 165))
+        tip = render_text(sfont, "Arrows: navigate, Enter: select, Esc: quit", (150, 155, 165))
         screen.blit(tip, (WINDOW_WIDTH // 2 - tip.get_width() // 2, WINDOW_HEIGHT - 50))
 
         if entering_ip:
             overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
             overlay.fill((0, 0, 0, 160))
             screen.blit(overlay, (0, 0))
-            prompt = sfont.render("Enter host IP (e.g., 192.168.1.10) and press Enter", True, (230, 230, 240))
+            prompt = render_text(sfont, "Enter host IP (e.g., 192.168.1.10) and press Enter", (230, 230, 240))
             screen.blit(prompt, (WINDOW_WIDTH // 2 - prompt.get_width() // 2, WINDOW_HEIGHT // 2 - 40))
             box_w = 360
             pygame.draw.rect(screen, (60, 60, 72), (WINDOW_WIDTH // 2 - box_w // 2, WINDOW_HEIGHT // 2, box_w, 36), border_radius=6)
-            text = sfont.render(input_ip, True, (240, 240, 240))
+            text = render_text(sfont, input_ip, (240, 240, 240))
             screen.blit(text, (WINDOW_WIDTH // 2 - box_w // 2 + 8, WINDOW_HEIGHT // 2 + 6))
 
         pygame.display.flip()
@@ -0,0 +1,37 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+A, B, C = ("10.0.0.1", 1000), ("10.0.0.2", 1000), ("10.0.0.1", 2000)
+
+
+def send(table, addr, now, n=0):
+    return table.receive(addr, {'type': 'input', 'n': n}, main.WIRE_BINARY, now)
+
+
+def test_full_table_hands_a_silent_seat_to_a_new_address():
+    table = main.ClientTable(max_clients=2)
+    assert (send(table, A, 0), send(table, B, 0)) == (0, 1)
+    send(table, A, 100, n=1)
+    # Everyone still live: the newcomer is turned away
+    assert send(table, C, 500) is None
+    send(table, B, main.NET_CLIENT_TIMEOUT_MS + 50)
+    # A has been silent longest and past the timeout; its queued input goes with it
+    assert send(table, C, main.NET_CLIENT_TIMEOUT_MS + 100, n=9) == 0
+    assert table.addrs == [C, B]
+    assert [m['n'] for m in table.drain(0)] == [9]
+    assert table.drain(0) == []
+    assert A not in table.streams
+
+
+def test_single_client_host_follows_the_latest_sender():
+    table = main.ClientTable(max_clients=1, first_player=1)
+    send(table, A, 0)
+    assert send(table, C, 10) == 0
+    assert table.addrs == [C]
+    assert table.streams[C].player == 1
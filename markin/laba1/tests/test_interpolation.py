@@ -0,0 +1,60 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+TANKS = [{'x': 60, 'y': 281, 'alive': True}, {'x': 802, 'y': 281, 'alive': True}]
+PX_PER_MS = main.BULLET_SPEED * main.TICK_RATE / 1000.0
+
+
+def snapshot(t, bullets):
+    return {'t': t, 'tanks': TANKS, 'bullets': bullets}
+
+
+def bullet(x):
+    return {'id': 7, 'x': x, 'y': 300.0, 'dx': 1, 'dy': 0, 'c': 1}
+
+
+def filled_buffer():
+    # Snapshots every 50 ms, arriving instantly; a bullet is fired at x=100 just before
+    # t=100 and is gone (hit something) by t=250
+    buf = main.SnapshotBuffer(delay_ms=100)
+    for t in range(0, 301, 50):
+        alive = 100 <= t < 250
+        buf.push(snapshot(t, [bullet(100 + (t - 100) * PX_PER_MS)] if alive else []), t)
+    return buf
+
+
+def drawn_x(buf, render_t):
+    pos = buf.bullet_positions(render_t + buf.delay_ms)
+    return pos[7][0] if 7 in pos else None
+
+
+def test_new_bullet_waits_for_render_time_and_never_goes_behind_the_muzzle():
+    buf = filled_buffer()
+    assert drawn_x(buf, 60) is None
+    assert drawn_x(buf, 99) is None
+    xs = [drawn_x(buf, t) for t in range(100, 200, 10)]
+    assert xs[0] == 100
+    assert all(b >= a for a, b in zip(xs, xs[1:]))
+    assert abs(drawn_x(buf, 125) - (100 + 25 * PX_PER_MS)) < 1e-6
+
+
+def test_removed_bullet_stays_until_render_time_reaches_its_removal():
+    buf = filled_buffer()
+    last_x = 100 + 100 * PX_PER_MS
+    assert drawn_x(buf, 200) == last_x
+    assert drawn_x(buf, 240) == last_x
+    assert drawn_x(buf, 250) is None
+
+
+def test_extrapolation_past_the_newest_snapshot_only_goes_forward():
+    buf = main.SnapshotBuffer(delay_ms=0)
+    buf.push(snapshot(0, [bullet(100)]), 0)
+    assert drawn_x(buf, 0) == 100
+    assert drawn_x(buf, 50) == 100 + 50 * PX_PER_MS
+    assert drawn_x(buf, 10 ** 6) == 100 + main.MAX_EXTRAPOLATION_MS * PX_PER_MS
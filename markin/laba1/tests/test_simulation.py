@@ -0,0 +1,60 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+IDLE = (main.TankInput(), main.TankInput())
+
+
+def open_arena():
+    # A live round on an empty field with nothing about to spawn
+    sim = main.Simulation(seed=1)
+    sim.walls.clear()
+    sim.wall_grid.clear()
+    sim.countdown_frames = 0
+    sim.powerup_spawn_cooldown = 10 ** 6
+    return sim
+
+
+def bullet_on(tank, color):
+    # Motionless, so it is still over the tank when collisions are checked
+    bullet = main.Bullet(tank.rect.centerx, tank.rect.centery, 0, 0, color)
+    bullet.id = 1
+    return bullet
+
+
+def test_single_hit_scores_for_the_shooter():
+    sim = open_arena()
+    sim.bullets.append(bullet_on(sim.tank2, main.COLOR_BULLET_1))
+    events = sim.step(IDLE)
+    assert [ev[3] for ev in events if ev[0] == "tank_destroyed"] == [sim.tank1]
+    assert (sim.tank1_destroyed, sim.tank2_destroyed) == (False, True)
+    assert (sim.tank1.score, sim.tank2.score) == (1, 0)
+    assert sim.round_end_timer > 0
+
+
+def test_mutual_kill_in_one_tick_scores_nobody():
+    sim = open_arena()
+    # Tank 2's bullet first in the list, which used to hand the point to player 2
+    sim.bullets.append(bullet_on(sim.tank1, main.COLOR_BULLET_2))
+    sim.bullets.append(bullet_on(sim.tank2, main.COLOR_BULLET_1))
+    events = sim.step(IDLE)
+    assert sum(1 for ev in events if ev[0] == "tank_destroyed") == 2
+    assert (sim.tank1_destroyed, sim.tank2_destroyed) == (True, True)
+    assert (sim.tank1.score, sim.tank2.score) == (0, 0)
+    assert sim.round_end_timer > 0
+
+
+def test_shield_absorbs_one_side_of_a_trade():
+    sim = open_arena()
+    sim.tank1.buff_shield_until = sim.now_ms() + 1000
+    sim.bullets.append(bullet_on(sim.tank1, main.COLOR_BULLET_2))
+    sim.bullets.append(bullet_on(sim.tank2, main.COLOR_BULLET_1))
+    events = sim.step(IDLE)
+    assert [ev[0] for ev in events if ev[0] in ("shield_hit", "tank_destroyed")] == ["shield_hit", "tank_destroyed"]
+    assert (sim.tank1_destroyed, sim.tank2_destroyed) == (False, True)
+    assert (sim.tank1.score, sim.tank2.score) == (1, 0)
@@ -0,0 +1,95 @@
+import os
+import random
+import sys
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+WIRES = (main.WIRE_BINARY, main.WIRE_JSON)
+
+
+def random_inputs(rng):
+    return tuple(main.TankInput(*(rng.random() < 0.3 for _ in range(4)), fire=rng.random() < 0.3) for _ in range(2))
+
+
+def played_snapshot():
+    # A running round with bullets in flight and a powerup on the field
+    sim = main.Simulation(seed=7)
+    rng = random.Random(7)
+    while not (sim.bullets and sim.powerups):
+        sim.step(random_inputs(rng))
+    sim.tank1.buff_speed_until = sim.now_ms() + 1234
+    return main.build_state_snapshot(sim, 4321)
+
+
+@pytest.mark.parametrize("wire", WIRES)
+def test_full_snapshot_round_trip(wire):
+    state = played_snapshot()
+    msg = main.decode_message(main.encode_message({**state, 'seq': 1, 'base': 0}, wire))
+    assert msg['type'] == 'state'
+    assert (msg['seq'], msg['base'], msg['t']) == (1, 0, 4321)
+    for key in ('scores', 'countdown', 'round_end', 'map', 'tanks', 'walls', 'powerups'):
+        assert msg[key] == state[key], key
+    assert msg['tanks'][0]['buffs'][2] == 1234
+    # Bullet positions travel in quarter pixels
+    assert len(msg['bullets']) == len(state['bullets'])
+    for got, sent in zip(msg['bullets'], state['bullets']):
+        assert (got['id'], got['dx'], got['dy'], got['c']) == (sent['id'], sent['dx'], sent['dy'], sent['c'])
+        assert abs(got['x'] - sent['x']) <= 1 / main.WIRE_POS_SCALE
+        assert abs(got['y'] - sent['y']) <= 1 / main.WIRE_POS_SCALE
+
+
+@pytest.mark.parametrize("wire", WIRES)
+def test_input_round_trip(wire):
+    msg = {'type': 'input', 'up': True, 'down': False, 'left': False, 'right': True, 'fire': True,
+           'time': 99, 'ack': 7, 'n': 12, 'prev': [1, 2, 3], 'sid': 'abc'}
+    assert main.decode_message(main.encode_message(msg, wire)) == msg
+
+
+@pytest.mark.parametrize("wire", WIRES)
+def test_deltas_rebuild_state_under_loss(wire):
+    # Lost datagrams and lost acks: whatever the client rebuilds must match what the host sent
+    sim = main.Simulation(seed=3)
+    rng = random.Random(1)
+    stream = main.SnapshotStream()
+    receiver = main.SnapshotReceiver()
+    checked = 0
+    for i in range(3000):
+        sim.step(random_inputs(rng))
+        if i % 3:
+            continue
+        state = main.build_state_snapshot(sim, i)
+        data = stream.encode(state, wire, i * 16)
+        assert len(data) <= main.WIRE_SNAPSHOT_BUDGET
+        if rng.random() < 0.2:
+            continue
+        got = receiver.receive(main.decode_message(data))
+        if got is None:
+            continue
+        if rng.random() > 0.3:
+            stream.ack(receiver.acked, i * 16 + 20)
+        for key in ('scores', 'map', 'tanks', 'powerups'):
+            assert got[key] == state[key], (i, key)
+        assert sorted(got['walls']) == sorted(state['walls'])
+        assert sorted(b['id'] for b in got['bullets']) == sorted(b['id'] for b in state['bullets'])
+        checked += 1
+    assert sim.map_version > 1
+    assert checked > 500
+
+
+def test_stale_and_duplicate_snapshots_are_dropped():
+    sim = main.Simulation(seed=5)
+    stream = main.SnapshotStream()
+    receiver = main.SnapshotReceiver()
+    first = main.decode_message(stream.encode(main.build_state_snapshot(sim, 0), main.WIRE_BINARY, 0))
+    sim.step((main.TankInput(), main.TankInput()))
+    second = main.decode_message(stream.encode(main.build_state_snapshot(sim, 16), main.WIRE_BINARY, 16))
+    assert receiver.receive(second) is not None
+    assert receiver.receive(first) is None
+    assert receiver.receive(second) is None
+    assert receiver.acked == second['seq']